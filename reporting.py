@@ -1,232 +1,374 @@
 import os
+import csv
 import pandas as pd
 import numpy as np
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, PageBreak, Spacer, Paragraph, Image
-from reportlab.lib.styles import ParagraphStyle
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
 import io
-import copy
-import glob
-from enum import Enum
+import shutil
+import tempfile
+import functools
+from enum import IntEnum
 
-DEBUG_MODE = False  # Set to True to enable debug output
+DEBUG_MODE = os.environ.get('RACE_DEBUG') == '1'  # Set RACE_DEBUG=1 (or True here) to enable debug output
+
+# lap_stats column for each abbreviated stats table header (other headers are the column name)
+STATS_TABLE_KEYS = {
+    "Break Time": "Breakout Time",
+    "Break Dist": "Breakout Dist",
+    "Strk->Wall": "Stroke to Wall",
+    "Strk Count": "Stroke Count",
+    "Strk/Sec": "Strokes per Second",
+}
+
+# Stats table headers, keyed by (has breakout data, is freestyle or backstroke)
+# Freestyle and backstroke have no turn time column
+STATS_TABLE_COLUMNS = {
+    (True, True): ("Lap", "Break Time", "Break->15", "15->Turn", "Strk->Wall",
+                   "Lap Time", "Break Dist", "UW Speed", "OW Speed", "Strk Count", "Strk/Sec"),
+    (True, False): ("Lap", "Break Time", "Break->15", "15->Turn", "Strk->Wall",
+                    "Turn Time", "Lap Time", "Break Dist", "UW Speed", "OW Speed", "Strk Count", "Strk/Sec"),
+    (False, True): ("Lap", "Strk->Wall", "Lap Time", "Strk Count", "Strk/Sec"),
+    (False, False): ("Lap", "Strk->Wall", "Turn Time", "Lap Time", "Strk Count", "Strk/Sec"),
+}
+
+# Index of each header in each stats table layout, and the lap_stats column of each header in order
+STATS_TABLE_COLUMN_INDICES = {
+    layout: {column: index for index, column in enumerate(columns)}
+    for layout, columns in STATS_TABLE_COLUMNS.items()
+}
+STATS_TABLE_STAT_KEYS = {
+    layout: tuple(STATS_TABLE_KEYS.get(column, column) for column in columns)
+    for layout, columns in STATS_TABLE_COLUMNS.items()
+}
+
+# Keys in the race data for the breakout and fifteen columns, with their (singular, plural) CSV names
+BREAK_FIFTEEN_KEYS = {
+    'breakout_times': ('breakout_time', 'breakout_times'),
+    'breakout_distances': ('breakout_distance', 'breakout_distances'),
+    'fifteen_times': ('fifteen_time', 'fifteen_times'),
+}
+
+# Cells read as NaN in the breakout and fifteen CSVs (pandas' default NA strings; blank cells are NaN too)
+BREAK_FIFTEEN_NA_VALUES = frozenset({
+    '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+# Stats table header descriptions printed under the table, two per row
+STATS_TABLE_DESCRIPTION_ROWS = (
+    ("Break Time: Time from wall/start to breakout (seconds)",
+     "Break->15: Time from breakout to 15m mark (seconds)"),
+    ("15->Turn: Time from 15m mark to next turn/finish (seconds)",
+     "Strk->Wall: Time from last stroke to wall (seconds)"),
+    ("Turn Time: Time from hand touch to push off (seconds)",
+     "Lap Time: Total time for the lap (seconds)"),
+    ("Break Dist: Distance travelled underwater (yards)",
+     "UW Speed: Underwater speed (yards/second)"),
+    ("OW Speed: Overwater speed (yards/second)",
+     "Strk Count: Number of strokes in the lap (strokes)"),
+    ("Strk/Sec: Stroke rate (strokes per second)", ""),
+)
+
+class EventType(IntEnum):
+    """Integer codes for the event types written by main.record_race_strokes_and_turns."""
+    START = 0
+    WATER_ENTRY = 1
+    STROKE = 2
+    TURN_START = 3
+    TURN_END = 4
+    END = 5
+
+# Event type names as stored in the CSV, indexed by EventType code
+EVENT_TYPE_NAMES = [event_type.name.lower() for event_type in EventType]
+
+# How each IM lap ends, as (marker event type, lap has a turn pair, skip the following turn_end).
+# Butterfly and breaststroke laps end at turn_start and are followed by their own turn_end,
+# backstroke and freestyle laps end at turn_end, and the backstroke to breaststroke transition
+# ends at turn_end but has a turn pair. The last lap is ended by the end event.
+_IM_FLY_BREAST_LAP = (EventType.TURN_START, True, True)
+_IM_BACK_FREE_LAP = (EventType.TURN_END, False, False)
+_IM_BACK_TO_BREAST_LAP = (EventType.TURN_END, True, False)
+
+def _im_lap_pattern(laps_per_stroke):
+    """
+    Build the lap ending pattern for an IM with laps_per_stroke laps of each stroke.
+    """
+    return ((_IM_FLY_BREAST_LAP,) * laps_per_stroke
+            + (_IM_BACK_FREE_LAP,) * (laps_per_stroke - 1) + (_IM_BACK_TO_BREAST_LAP,)
+            + (_IM_FLY_BREAST_LAP,) * laps_per_stroke
+            + (_IM_BACK_FREE_LAP,) * (laps_per_stroke - 1))
+
+# Lap ending patterns by IM distance (200 IM has 2 laps of each stroke, 400 IM has 4)
+_IM_LAP_PATTERNS = {200: _im_lap_pattern(2), 400: _im_lap_pattern(4)}
+
+# Size of each lap plot in the PDF (points) and the DPI it is rendered at
+# 108 DPI is 1.5x reportlab's 72 points per inch, so the PNG is never upscaled
+LAP_PLOT_WIDTH = 250
+LAP_PLOT_HEIGHT = 200
+LAP_PLOT_DPI = 108
+
+# PIL options for the plot PNGs (zlib level 1 instead of the default 6)
+PNG_SAVE_KWARGS = {'compress_level': 1}
 
 def debug_print(*args, **kwargs):
     """Print debug messages only when DEBUG_MODE is enabled."""
     if DEBUG_MODE:
         print("DEBUG:", *args, **kwargs)
 
-def calculate_lap_markers(events, stroke, distance):
+@functools.lru_cache(maxsize=None)
+def _report_styles():
+    """
+    Build the paragraph and fixed table styles used in the report once and share them between reports.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import TableStyle
+    return {
+        'title': ParagraphStyle(
+            'Title',
+            fontSize=12,
+            fontName='Helvetica-Bold',
+            alignment=0,  # 0 = left, 1 = center, 2 = right
+            spaceAfter=6  # Increased spacing after the title
+        ),
+        'info': ParagraphStyle(
+            'Info',
+            fontSize=9,
+            fontName='Helvetica',
+            alignment=0,
+            spaceAfter=2  # Increased spacing after each info line
+        ),
+        'note': ParagraphStyle(
+            'Note',
+            fontSize=7,
+            fontName='Helvetica-Oblique'
+        ),
+        'description': ParagraphStyle(
+            'Description',
+            fontSize=7,
+            fontName='Helvetica',
+            leading=9  # Line spacing
+        ),
+        'lap_title': ParagraphStyle(
+            'Title',
+            fontSize=10,
+            fontName='Helvetica-Bold',
+            alignment=0,
+            spaceAfter=4
+        ),
+        # Lap plot page tables
+        'plot_table': TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ]),
+        # Basic stats table styling - the column lines and averages row are added per table
+        'stats_table': (
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),  # Smaller font size
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),  # Standard thin grid
+            ('TOPPADDING', (0, 0), (-1, -1), 1),  # Minimal padding
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),  # Header row background
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),  # Header row text color
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # Header row bold
+        ),
+        # Stats table descriptions
+        'description_table': TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]),
+    }
+
+def encode_event_types(event_types):
+    """
+    Convert a sequence of event type names to an int8 array of EventType codes.
+    Unknown event types get the code -1.
+    """
+    return np.asarray(pd.Categorical(event_types, categories=EVENT_TYPE_NAMES).codes, dtype=np.int8)
+
+def _event_arrays(data):
+    """
+    Return the race events in data as parallel NumPy arrays (times, codes).
+    Uses the arrays stored by run() when present. Callers that pass a list of event dicts
+    in data['events'] instead get the arrays built from it once and stored in data,
+    so the stats and plot functions all share them.
+    """
+    if 'event_times' not in data:
+        events = data.get('events', [])
+        data['event_times'] = _read_only(np.array([e['time'] for e in events], dtype=float))
+        data['event_codes'] = _read_only(encode_event_types([e['type'] for e in events]))
+    return data['event_times'], data['event_codes']
+
+def _sorted_event_arrays(data):
+    """
+    Return the race events in data sorted by time, as parallel arrays (times, codes).
+    They are sorted once and kept in data. The sort is stable, so masking the result by
+    event type gives the times of that type in order, without sorting them again.
+    """
+    if 'sorted_event_times' not in data:
+        times, codes = _event_arrays(data)
+        order = np.argsort(times, kind='stable')
+        data['sorted_event_times'] = _read_only(times[order])
+        data['sorted_event_codes'] = _read_only(codes[order])
+    return data['sorted_event_times'], data['sorted_event_codes']
+
+def _sorted_times_by_type(data):
+    """
+    Return a dict of the sorted event times of each EventType in data.
+    Split out of the sorted events once and kept in data, so the stats and every plot
+    look up e.g. the stroke times instead of masking all the events again.
+    """
+    if 'sorted_times_by_type' not in data:
+        times, codes = _sorted_event_arrays(data)
+        data['sorted_times_by_type'] = {
+            event_type: _read_only(times[codes == event_type]) for event_type in EventType
+        }
+    return data['sorted_times_by_type']
+
+def _read_only(array):
+    """
+    Mark an array read-only and return it. The event arrays are shared by the stats and
+    every plot without copying, so none of them may change the arrays in place.
+    """
+    array.flags.writeable = False
+    return array
+
+def race_distance(race_details):
+    """
+    Return the race distance as an int, whether it is stored as an int or a string.
+    """
+    return int(race_details['distance'].value)
+
+def race_lap_markers(data, race_details):
+    """
+    Return (lap_markers, laps_with_turn_pairs) for the race in data.
+    They are calculated once and kept in data, so the stats and the stroke plots share them
+    (the markers are read-only, like the event arrays they come from).
+    """
+    if 'lap_markers' not in data:
+        times, codes = _event_arrays(data)
+        lap_markers, laps_with_turn_pairs = calculate_lap_markers(
+            times, codes, race_details['stroke'].value, race_distance(race_details))
+        data['lap_markers'] = _read_only(lap_markers)
+        data['laps_with_turn_pairs'] = frozenset(laps_with_turn_pairs)
+    return data['lap_markers'], data['laps_with_turn_pairs']
+
+def calculate_lap_markers(times, codes, stroke, distance):
     """
     Calculate lap markers based on stroke type and distance.
-    Returns a list of timestamps marking the start/end of each lap.
+    times and codes are parallel arrays of event times and EventType codes.
+    Returns an array of timestamps marking the start/end of each lap.
     """
-    lap_markers = [0.0]  # Start with 0 for first lap
+    lap_markers = np.zeros(1)  # Start with 0 for first lap
     laps_with_turn_pairs = set()  # Track which laps have turn_start/turn_end pairs
     
     debug_print(f"Processing {stroke} race with distance {distance}")
     
     if stroke in ["breaststroke", "butterfly"]:
         # For breast/fly, use turn_start events
-        lap_markers.extend([e['time'] for e in events if e['type'] == 'turn_start'])
+        lap_markers = np.concatenate((lap_markers, times[codes == EventType.TURN_START]))
         # All laps have turn pairs
         laps_with_turn_pairs = set(range(1, len(lap_markers)))
     elif stroke == "im":
         # For IM, we need a more sophisticated approach to handle the turn patterns
         
         # Get all turn events sorted by time
-        all_turns = [(e['time'], e['type']) for e in events if e['type'] in ['turn_start', 'turn_end']]
-        all_turns.sort(key=lambda x: x[0])
+        turn_mask = (codes == EventType.TURN_START) | (codes == EventType.TURN_END)
+        turn_times = times[turn_mask]
+        turn_types = codes[turn_mask]
+        order = np.argsort(turn_times, kind='stable')
+        turn_times = turn_times[order]
+        turn_types = turn_types[order]
+        all_turns = list(zip(turn_times.tolist(), turn_types.tolist()))
         
         debug_print(f"IM race with distance {distance}")
         debug_print(f"Found {len(all_turns)} turn events")
         
-        # For 200 IM (8 laps - 2 of each stroke)
-        if distance == 200:
+        # Look up how each lap ends for this distance (200 IM and 400 IM)
+        lap_pattern = _IM_LAP_PATTERNS.get(distance)
+        if lap_pattern is not None:
             # Process turns to identify lap boundaries
             current_lap = 1
-            expected_laps = 8  # 200 IM has 8 laps (2 of each stroke)
-            
-            # Group turns by pairs (start/end) where applicable
-            i = 0
-            while i < len(all_turns) and current_lap < expected_laps:
-                turn_time, turn_type = all_turns[i]
-                
-                # For butterfly portions (laps 1-2)
-                # We expect turn_start followed by turn_end
-                if current_lap in [1, 2]:
-                    if turn_type == 'turn_start':
-                        lap_markers.append(turn_time)
-                        laps_with_turn_pairs.add(current_lap)  # This lap has a turn pair
-                        current_lap += 1
-                        # Skip the corresponding turn_end
-                        if i+1 < len(all_turns) and all_turns[i+1][1] == 'turn_end':
-                            i += 2
-                            continue
-                
-                # For backstroke portions (laps 3-4)
-                # We expect turn_end for lap 3, but special case for lap 4 (backstroke to breaststroke)
-                elif current_lap == 3:
-                    if turn_type == 'turn_end':
-                        lap_markers.append(turn_time)
-                        # No turn pair for backstroke
-                        current_lap += 1
-                
-                # Special case: backstroke to breaststroke transition (lap 4)
-                # This has both turn_start and turn_end
-                elif current_lap == 4:
-                    # For the backstroke to breaststroke transition, use turn_end
-                    if turn_type == 'turn_end':
-                        lap_markers.append(turn_time)
-                        laps_with_turn_pairs.add(current_lap)  # This lap has a turn pair
-                        current_lap += 1
-                
-                # For breaststroke portions (laps 5-6)
-                # We expect turn_start followed by turn_end
-                elif current_lap in [5, 6]:
-                    if turn_type == 'turn_start':
-                        lap_markers.append(turn_time)
-                        laps_with_turn_pairs.add(current_lap)  # This lap has a turn pair
-                        current_lap += 1
-                        # Skip the corresponding turn_end
-                        if i+1 < len(all_turns) and all_turns[i+1][1] == 'turn_end':
-                            i += 2
-                            continue
-                
-                # For freestyle portion (lap 7)
-                # We expect just turn_end
-                elif current_lap == 7:
-                    if turn_type == 'turn_end':
-                        lap_markers.append(turn_time)
-                        # No turn pair for freestyle
-                        current_lap += 1
-                
-                i += 1
+            expected_laps = len(lap_pattern) + 1
             
-            # If we didn't get enough lap markers, use a simpler approach
-            if len(lap_markers) < expected_laps:
-                debug_print("Not enough lap markers found with sophisticated approach, using simpler method")
-                lap_markers = [0.0]  # Reset and try simpler approach
-                laps_with_turn_pairs = set()  # Reset turn pairs
-                
-                # For 200 IM, we need 7 turn markers to create 8 laps
-                # Just use the first 7 turn events regardless of type
-                turn_times = [t[0] for t in all_turns]
-                if len(turn_times) >= 7:
-                    lap_markers.extend(turn_times[:7])
-                else:
-                    # Use whatever we have
-                    lap_markers.extend(turn_times)
-        
-        # For 400 IM (16 laps - 4 of each stroke)
-        elif distance == 400:
-            # Similar approach for 400 IM but with more laps
-            # Process turns to identify lap boundaries
-            current_lap = 1
-            expected_laps = 16  # 400 IM has 16 laps (4 of each stroke)
+            # Lap markers are filled in by index - the marker for the end of lap n goes at index n
+            lap_markers = np.empty(expected_laps)
+            lap_markers[0] = 0.0
             
             # Group turns by pairs (start/end) where applicable
             i = 0
             while i < len(all_turns) and current_lap < expected_laps:
                 turn_time, turn_type = all_turns[i]
+                marker_type, has_turn_pair, skip_turn_end = lap_pattern[current_lap - 1]
                 
-                # For butterfly portions (laps 1-4)
-                # We expect turn_start followed by turn_end
-                if current_lap in [1, 2, 3, 4]:
-                    if turn_type == 'turn_start':
-                        lap_markers.append(turn_time)
-                        laps_with_turn_pairs.add(current_lap)  # This lap has a turn pair
-                        current_lap += 1
-                        # Skip the corresponding turn_end
-                        if i+1 < len(all_turns) and all_turns[i+1][1] == 'turn_end':
-                            i += 2
-                            continue
-                
-                # For backstroke portions (laps 5-8)
-                # We expect turn_end for laps 5-7, but special case for lap 8 (backstroke to breaststroke)
-                elif current_lap in [5, 6, 7]:
-                    if turn_type == 'turn_end':
-                        lap_markers.append(turn_time)
-                        # No turn pair for backstroke
-                        current_lap += 1
-                
-                # Special case: backstroke to breaststroke transition (lap 8)
-                # This has both turn_start and turn_end
-                elif current_lap == 8:
-                    # For the backstroke to breaststroke transition, use turn_end
-                    if turn_type == 'turn_end':
-                        lap_markers.append(turn_time)
-                        laps_with_turn_pairs.add(current_lap)  # This lap has a turn pair
-                        current_lap += 1
-                
-                # For breaststroke portions (laps 9-12)
-                # We expect turn_start followed by turn_end
-                elif current_lap in [9, 10, 11, 12]:
-                    if turn_type == 'turn_start':
-                        lap_markers.append(turn_time)
+                if turn_type == marker_type:
+                    lap_markers[current_lap] = turn_time
+                    if has_turn_pair:
                         laps_with_turn_pairs.add(current_lap)  # This lap has a turn pair
-                        current_lap += 1
-                        # Skip the corresponding turn_end
-                        if i+1 < len(all_turns) and all_turns[i+1][1] == 'turn_end':
-                            i += 2
-                            continue
-                
-                # For freestyle portions (laps 13-15)
-                # We expect just turn_end
-                elif current_lap in [13, 14, 15]:
-                    if turn_type == 'turn_end':
-                        lap_markers.append(turn_time)
-                        # No turn pair for freestyle
-                        current_lap += 1
+                    current_lap += 1
+                    # Skip the corresponding turn_end
+                    if skip_turn_end and i+1 < len(all_turns) and all_turns[i+1][1] == EventType.TURN_END:
+                        i += 2
+                        continue
                 
                 i += 1
             
             # If we didn't get enough lap markers, use a simpler approach
-            if len(lap_markers) < expected_laps:
+            if current_lap < expected_laps:
                 debug_print("Not enough lap markers found with sophisticated approach, using simpler method")
-                lap_markers = [0.0]  # Reset and try simpler approach
                 laps_with_turn_pairs = set()  # Reset turn pairs
                 
-                # For 400 IM, we need 15 turn markers to create 16 laps
-                turn_times = [t[0] for t in all_turns]
-                if len(turn_times) >= 15:
-                    lap_markers.extend(turn_times[:15])
-                else:
-                    # Use whatever we have
-                    lap_markers.extend(turn_times)
+                # Just use the first turn events regardless of type (7 for 200 IM, 15 for 400 IM, or whatever we have)
+                lap_markers = np.concatenate(([0.0], turn_times[:expected_laps - 1]))
     else:
         # For freestyle and backstroke, use turn_end events
-        lap_markers.extend([e['time'] for e in events if e['type'] == 'turn_end'])
+        lap_markers = np.concatenate((lap_markers, times[codes == EventType.TURN_END]))
     
-    # Add the final time
-    end_events = [e['time'] for e in events if e['type'] == 'end']
-    if end_events:
-        lap_markers.append(end_events[0])
+    # Add the final time (the first end event)
+    is_end = codes == EventType.END
+    if is_end.any():
+        lap_markers = np.append(lap_markers, times[is_end.argmax()])
     
-    debug_print(f"DEBUG: Lap markers before filtering: {lap_markers}")
+    # Printing the markers formats every element, so it is only done when debugging
+    if DEBUG_MODE:
+        debug_print(f"DEBUG: Lap markers before filtering: {lap_markers}")
     
     # Ensure lap markers are sorted
-    lap_markers.sort()
+    lap_markers = np.sort(lap_markers)
     
     # Remove any markers that are too close together (within 0.1 seconds)
-    filtered_markers = [lap_markers[0]]  # Always keep the first marker (start time)
-    for i in range(1, len(lap_markers)):
-        if lap_markers[i] - filtered_markers[-1] > 0.1:  # Only add if more than 0.1s from previous
-            filtered_markers.append(lap_markers[i])
-    
-    lap_markers = filtered_markers
+    # Usually no two markers are, which one comparison of all the gaps shows; otherwise each
+    # marker has to be compared with the last one kept, not just the one before it
+    if not (np.diff(lap_markers) > 0.1).all():
+        lap_markers = lap_markers.tolist()
+        filtered_markers = [lap_markers[0]]  # Always keep the first marker (start time)
+        for i in range(1, len(lap_markers)):
+            if lap_markers[i] - filtered_markers[-1] > 0.1:  # Only add if more than 0.1s from previous
+                filtered_markers.append(lap_markers[i])
+        
+        lap_markers = np.array(filtered_markers)
     
-    debug_print(f"DEBUG: Lap markers after filtering: {lap_markers}")
-    debug_print(f"DEBUG: Number of laps: {len(lap_markers) - 1}")
-    debug_print(f"DEBUG: Laps with turn pairs: {laps_with_turn_pairs}")
+    if DEBUG_MODE:
+        debug_print(f"DEBUG: Lap markers after filtering: {lap_markers}")
+        debug_print(f"DEBUG: Number of laps: {len(lap_markers) - 1}")
+        debug_print(f"DEBUG: Laps with turn pairs: {laps_with_turn_pairs}")
     
     return lap_markers, laps_with_turn_pairs
 
+def _round_values(values, ndigits=2):
+    """
+    Round each value in an array the way the builtin round does.
+    np.round scales by a power of ten first, so it can round the other way on ties
+    such as the .xx5 differences between millisecond timestamps.
+    """
+    return np.array([round(value, ndigits) for value in values.tolist()])
+
 def calculate_per_lap_stats(data, race_details):
     """
     Calculate statistics for each lap from the event data and breakout/fifteen data.
@@ -235,21 +377,22 @@ def calculate_per_lap_stats(data, race_details):
     """
     stroke = race_details['stroke'].value
     
-    # Convert distance to integer if it's a string
-    distance = race_details['distance'].value
-    if isinstance(distance, str):
-        distance = int(distance)
+    # Get the event times and type codes from stroke_and_turn data
+    times, codes = _event_arrays(data)
     
-    # Get the events from stroke_and_turn data
-    events = data.get('events', [])  # List of {type, time} dictionaries
+    # The same events in time order, with a mask for the turns
+    sorted_times, sorted_codes = _sorted_event_arrays(data)
+    sorted_turn_mask = (sorted_codes == EventType.TURN_START) | (sorted_codes == EventType.TURN_END)
     
-    # Debug: Print all events to see what we're working with
-    debug_print(f"DEBUG: Total events: {len(events)}")
-    debug_print(f"DEBUG: Event types: {set(e['type'] for e in events)}")
-    turn_events = [e for e in events if e['type'].startswith('turn_')]
-    debug_print(f"DEBUG: Turn events: {len(turn_events)}")
-    for i, e in enumerate(turn_events):
-        debug_print(f"DEBUG: Turn {i+1}: {e['type']} at {e['time']:.2f}s")
+    # Debug: Print all events to see what we're working with (built only in debug mode, as one line)
+    if DEBUG_MODE:
+        turn_mask = (codes == EventType.TURN_START) | (codes == EventType.TURN_END)
+        log = [f"DEBUG: Total events: {len(times)}",
+               f"DEBUG: Event types: {set(EVENT_TYPE_NAMES[code] for code in np.unique(codes) if code >= 0)}",
+               f"DEBUG: Turn events: {int(turn_mask.sum())}"]
+        log.extend(f"DEBUG: Turn {i+1}: {EVENT_TYPE_NAMES[code]} at {t:.2f}s"
+                   for i, (t, code) in enumerate(zip(times[turn_mask].tolist(), codes[turn_mask].tolist())))
+        debug_print("\n".join(log))
     
     # Get breakout/fifteen data if available
     breakout_times = data.get('breakout_times', None)
@@ -260,8 +403,8 @@ def calculate_per_lap_stats(data, race_details):
     has_breakout_data = all(x is not None for x in [breakout_times, breakout_distances, fifteen_times])
     debug_print(f"DEBUG: Has breakout data: {has_breakout_data} in calculate_per_lap_stats")
     
-    # Calculate lap markers using the new function
-    lap_markers, laps_with_turn_pairs = calculate_lap_markers(events, stroke, distance)
+    # Get the lap markers (shared with the stroke plots)
+    lap_markers, laps_with_turn_pairs = race_lap_markers(data, race_details)
     
     num_laps = len(lap_markers) - 1  # Number of laps is one less than number of markers
     
@@ -269,157 +412,169 @@ def calculate_per_lap_stats(data, race_details):
     # This is a simpler approach that doesn't rely on associating turns with laps
     turn_times = {}  # Dictionary to store turn times by lap
     
-    # Sort all turn events by time
-    all_turn_events = sorted([e for e in events if e['type'].startswith('turn_')], key=lambda x: x['time'])
+    # Get all turn events sorted by time
+    all_turn_times = sorted_times[sorted_turn_mask]
+    all_turn_codes = sorted_codes[sorted_turn_mask]
+    
+    # Pair each turn_start with a turn_end directly after it (pairs can never overlap,
+    # since the second event of a pair is a turn_end and so cannot start the next one)
+    pair_indices = np.flatnonzero((all_turn_codes[:-1] == EventType.TURN_START) &
+                                  (all_turn_codes[1:] == EventType.TURN_END))
+    pair_starts = all_turn_times[pair_indices, np.newaxis]
+    pair_ends = all_turn_times[pair_indices + 1, np.newaxis]
+    
+    if num_laps > 0:
+        # Each turn belongs to the first lap that has its turn_start in it or whose next lap has
+        # its turn_end in it, checked for every pair and lap at once (one row per pair)
+        in_lap = (lap_markers[:-1] <= pair_starts) & (pair_starts <= lap_markers[1:])
+        in_lap[:, :-1] |= (lap_markers[1:-1] <= pair_ends) & (pair_ends <= lap_markers[2:])
+        has_lap = in_lap.any(axis=1)
+        pair_laps = in_lap.argmax(axis=1)[has_lap]
+        pair_turn_times = _round_values((pair_ends - pair_starts)[has_lap, 0])
+        
+        # A later pair in the same lap replaces an earlier one
+        turn_times = dict(zip((pair_laps + 1).tolist(), pair_turn_times.tolist()))
     
-    # Process turn events in pairs
-    i = 0
-    while i < len(all_turn_events) - 1:
-        current = all_turn_events[i]
-        next_event = all_turn_events[i + 1]
-        
-        # If we find a turn_start followed by a turn_end
-        if current['type'] == 'turn_start' and next_event['type'] == 'turn_end':
-            # Calculate the turn time
-            turn_time = next_event['time'] - current['time']
-            
-            # Find which lap this turn belongs to
-            for lap in range(num_laps):
-                lap_start = lap_markers[lap]
-                lap_end = lap_markers[lap + 1]
-                
-                # If the turn_start is in this lap or the turn_end is in the next lap
-                if lap_start <= current['time'] <= lap_end or (lap < num_laps - 1 and lap_end <= next_event['time'] <= lap_markers[lap + 2]):
-                    turn_times[lap + 1] = round(turn_time, 2)
-                    break
-            
-            i += 2  # Skip both events
-        else:
-            i += 1  # Move to next event
-    
-    debug_print(f"DEBUG: Calculated turn times: {turn_times} in calculate_per_lap_stats")
+    if DEBUG_MODE:
+        debug_print(f"DEBUG: Calculated turn times: {turn_times} in calculate_per_lap_stats")
     
     # Check if this is freestyle or backstroke (no turn time)
     is_free_or_back = stroke in ["freestyle", "backstroke"]
     
-    # Get water entry events
-    water_entry_events = [e for e in events if e['type'] == 'water_entry']
-
-    if len(water_entry_events) > 1:
+    # Get water entry times
+    water_entry_times = times[codes == EventType.WATER_ENTRY].tolist()
+    
+    # Each lap's strokes and turns are found with a binary search in the sorted times
+    stroke_times = _sorted_times_by_type(data)[EventType.STROKE]
+    lap_stroke_starts = np.searchsorted(stroke_times, lap_markers[:-1], side='left')
+    lap_stroke_ends = np.searchsorted(stroke_times, lap_markers[1:], side='right')
+    lap_turn_ends = np.searchsorted(all_turn_times, lap_markers[1:], side='right')
+    
+    if len(water_entry_times) > 1:
         debug_print("DEBUG: Found multiple water entry events, using the first one in calculate_per_lap_stats")
-        water_entry_events = water_entry_events[:1]
-    
-    lap_stats = []
-    
-    for lap in range(num_laps):
-        lap_stat = {"Lap": lap + 1}
-        
-        # Calculate lap time (time between markers)
-        lap_start = lap_markers[lap]
-        lap_end = lap_markers[lap + 1]
-        lap_stat["Lap Time"] = round(lap_end - lap_start, 2)
-        
-        # Get all strokes and turns in this lap
-        lap_strokes = [e for e in events 
-                      if e['type'] == 'stroke' 
-                      and lap_start <= e['time'] <= lap_end]
-        
-        lap_turns = [e for e in events 
-                    if e['type'].startswith('turn_') 
-                    and lap_start <= e['time'] <= lap_end]
-        
-        # Calculate stroke to wall time (from last stroke to next turn event)
-        last_stroke_time = None
-        if lap_strokes:
-            last_stroke_time = max(s['time'] for s in lap_strokes)
-            next_turn = min((t['time'] for t in lap_turns if t['time'] > last_stroke_time), default=lap_end)
-            lap_stat["Stroke to Wall"] = round(next_turn - last_stroke_time, 2)
-        
-        # Use the pre-calculated turn time for this lap if available
-        lap_stat["Turn Time"] = turn_times.get(lap + 1, None)
-        
-        # Count strokes in this lap
-        strokes = len(lap_strokes)
-        if strokes > 0:
-            # Use breakout time if it exists, otherwise find first stroke
-            start_swimming = lap_stat.get("Breakout Time") or lap_strokes[0]['time']
-            swimming_duration = lap_end - start_swimming
-            
-            lap_stat.update({
-                "Stroke Count": int(strokes),
-                "Strokes per Second": round(strokes / swimming_duration if swimming_duration > 0 else 0, 2)
-            })
-        
-        # Add breakout and 15m data if available
-        if has_breakout_data and lap < len(breakout_times):
-            # For first lap, use water entry time if available, otherwise use start time
-            if lap == 0 and water_entry_events:
-                underwater_start_time = water_entry_events[0]['time']
-            else:
-                # For subsequent laps, use the lap marker (turn end)
-                underwater_start_time = lap_markers[lap]
-            
-            # Calculate breakout time relative to the underwater start time
-            relative_breakout_time = breakout_times[lap] - underwater_start_time
-            
-            # Breakout distance is already in yards (user input)
-            breakout_yards = breakout_distances[lap]
-            
-            # Calculate underwater speed in yards per second
-            underwater_speed = breakout_yards / relative_breakout_time if relative_breakout_time > 0 else 0
-            
-            # Calculate overwater speed (from breakout to last stroke)
-            # Distance is 25 yards minus breakout distance minus 0.5 yards (to account for hand touch)
-            overwater_distance = 25.0 - breakout_yards - 0.5
-            
-            # Time is from breakout to last stroke (if available)
-            if last_stroke_time and last_stroke_time > breakout_times[lap]:
-                overwater_time = last_stroke_time - breakout_times[lap]
-            else:
-                # Fallback to using lap end time if no stroke data
-                overwater_time = lap_end - breakout_times[lap]
-            
-            # Calculate speed in yards per second
-            overwater_speed = overwater_distance / overwater_time if overwater_time > 0 else 0
-            
-            # Calculate breakout to 15m time
-            # Note: 15m mark is at 16.4042 yards but we keep the name "15m" for reference
-            breakout_to_fifteen = fifteen_times[lap] - breakout_times[lap]
-            
-            lap_stat.update({
-                "Breakout Time": round(relative_breakout_time, 2),
-                "Breakout Dist": round(breakout_yards, 2),
-                "UW Speed": round(underwater_speed, 2),
-                "OW Speed": round(overwater_speed, 2),
-                "Break->15": round(breakout_to_fifteen, 2),
-                "15->Turn": round(lap_end - fifteen_times[lap], 2),
-            })
-        
-        lap_stats.append(lap_stat)
-    
-    return pd.DataFrame(lap_stats)
+        water_entry_times = water_entry_times[:1]
+    
+    # Lap start and end times (the markers between laps)
+    lap_starts = lap_markers[:-1]
+    lap_ends = lap_markers[1:]
+    
+    # One array per column, filled in for the laps that have a value (NaN where a lap has none)
+    columns = {
+        "Lap": np.arange(1, num_laps + 1),
+        "Lap Time": _round_values(lap_ends - lap_starts),  # Time between markers
+        "Stroke to Wall": np.full(num_laps, np.nan),
+        "Turn Time": np.full(num_laps, np.nan),
+        "Stroke Count": np.full(num_laps, np.nan),
+        "Strokes per Second": np.full(num_laps, np.nan),
+        "Breakout Time": np.full(num_laps, np.nan),
+        "Breakout Dist": np.full(num_laps, np.nan),
+        "UW Speed": np.full(num_laps, np.nan),
+        "OW Speed": np.full(num_laps, np.nan),
+        "Break->15": np.full(num_laps, np.nan),
+        "15->Turn": np.full(num_laps, np.nan),
+    }
+    
+    # Count the strokes in each lap, and find the first and last stroke of the laps that have any
+    stroke_counts = lap_stroke_ends - lap_stroke_starts
+    has_strokes = stroke_counts > 0
+    first_stroke_times = stroke_times[lap_stroke_starts[has_strokes]]
+    last_stroke_times = np.full(num_laps, np.nan)
+    last_stroke_times[has_strokes] = stroke_times[lap_stroke_ends[has_strokes] - 1]
+    
+    # Calculate stroke to wall time (from last stroke to next turn event in the lap, or the lap end)
+    last_strokes = last_stroke_times[has_strokes]
+    next_turn_indices = np.searchsorted(all_turn_times, last_strokes, side='right')
+    next_turns = np.where(next_turn_indices < lap_turn_ends[has_strokes],
+                          np.append(all_turn_times, np.nan)[next_turn_indices], lap_ends[has_strokes])
+    columns["Stroke to Wall"][has_strokes] = _round_values(next_turns - last_strokes)
+    
+    # Use the pre-calculated turn times where available
+    for lap_number, turn_time in turn_times.items():
+        columns["Turn Time"][lap_number - 1] = turn_time
+    
+    # Swimming is timed from the first stroke (the breakout time is only filled in below)
+    swimming_durations = lap_ends[has_strokes] - first_stroke_times
+    columns["Stroke Count"][has_strokes] = stroke_counts[has_strokes]
+    columns["Strokes per Second"][has_strokes] = _round_values(np.divide(
+        stroke_counts[has_strokes], swimming_durations,
+        out=np.zeros(swimming_durations.size), where=swimming_durations > 0))
+    
+    # Add breakout and 15m data if available, for every lap that has it at once
+    if has_breakout_data:
+        breakout_laps = min(num_laps, len(breakout_times))
+        lap_breakouts = np.asarray(breakout_times[:breakout_laps], dtype=float)
+        lap_fifteens = np.asarray(fifteen_times[:breakout_laps], dtype=float)
+        lap_end_times = lap_ends[:breakout_laps]
+        
+        # Breakout distance is already in yards (user input)
+        breakout_yards = np.asarray(breakout_distances[:breakout_laps], dtype=float)
+        
+        # Underwater time starts at the lap marker (turn end), or for the first lap
+        # at the water entry time if available, otherwise at the start time
+        underwater_start_times = lap_starts[:breakout_laps].copy()
+        if breakout_laps and water_entry_times:
+            underwater_start_times[0] = water_entry_times[0]
+        
+        # Calculate breakout time relative to the underwater start time
+        relative_breakout_times = lap_breakouts - underwater_start_times
+        
+        # Calculate underwater speed in yards per second
+        underwater_speeds = np.divide(breakout_yards, relative_breakout_times,
+                                      out=np.zeros(breakout_laps), where=relative_breakout_times > 0)
+        
+        # Calculate overwater speed (from breakout to last stroke)
+        # Distance is 25 yards minus breakout distance minus 0.5 yards (to account for hand touch)
+        overwater_distances = 25.0 - breakout_yards - 0.5
+        
+        # Time is from breakout to last stroke if the lap has one after the breakout,
+        # otherwise fall back to using the lap end time (NaN last strokes never compare greater)
+        lap_last_strokes = last_stroke_times[:breakout_laps]
+        after_breakout = (lap_last_strokes != 0) & (lap_last_strokes > lap_breakouts)
+        overwater_times = np.where(after_breakout, lap_last_strokes, lap_end_times) - lap_breakouts
+        
+        # Calculate speed in yards per second
+        overwater_speeds = np.divide(overwater_distances, overwater_times,
+                                     out=np.zeros(breakout_laps), where=overwater_times > 0)
+        
+        # Calculate breakout to 15m time
+        # Note: 15m mark is at 16.4042 yards but we keep the name "15m" for reference
+        columns["Breakout Time"][:breakout_laps] = _round_values(relative_breakout_times)
+        columns["Breakout Dist"][:breakout_laps] = _round_values(breakout_yards)
+        columns["UW Speed"][:breakout_laps] = _round_values(underwater_speeds)
+        columns["OW Speed"][:breakout_laps] = _round_values(overwater_speeds)
+        columns["Break->15"][:breakout_laps] = _round_values(lap_fifteens - lap_breakouts)
+        columns["15->Turn"][:breakout_laps] = _round_values(lap_end_times - lap_fifteens)
+    
+    # Stroke counts are whole numbers, missing (NA) for laps without strokes
+    columns["Stroke Count"] = pd.array(columns["Stroke Count"], dtype="Int64")
+    
+    # Leave out columns with no values at all (e.g. breakout columns without breakout data)
+    # The arrays were made here for the frame, so it takes them over instead of copying them
+    return pd.DataFrame({
+        name: values for name, values in columns.items()
+        if len(values) and not pd.isna(values).all()
+    }, copy=False)
 
-def count_strokes_in_lap(events, lap_start, lap_end):
+def count_strokes_in_lap(times, codes, lap_start, lap_end):
     """
     Count the number of strokes that occurred during the specified lap timeframe.
+    times and codes are parallel arrays of event times and EventType codes.
     """
-    return sum(1 for e in events 
-              if e['type'] == 'stroke' 
-              and lap_start <= e['time'] <= lap_end)
+    return int(np.count_nonzero((codes == EventType.STROKE) & (times >= lap_start) & (times <= lap_end)))
 
-def calculate_turn_speed(events, turn_time):
+def calculate_turn_speed(times, codes, turn_time):
     """
     Calculate the turn speed based on turn start and end times.
     Only applicable for breaststroke and butterfly.
+    times and codes are parallel arrays of event times and EventType codes.
     """
     # Find the turn_start and turn_end events around this turn time
-    turn_events = [e for e in events 
-                  if e['type'].startswith('turn_') 
-                  and abs(e['time'] - turn_time) < 1.8]  # Within 1 second of turn
+    is_turn = (codes == EventType.TURN_START) | (codes == EventType.TURN_END)
+    turn_times = times[is_turn & (np.abs(times - turn_time) < 1.8)]  # Within 1 second of turn
     
-    if len(turn_events) >= 2:
-        turn_start = min(e['time'] for e in turn_events)
-        turn_end = max(e['time'] for e in turn_events)
+    if turn_times.size >= 2:
+        turn_start = turn_times.min()
+        turn_end = turn_times.max()
         return 1.0 / (turn_end - turn_start)  # Speed as 1/duration
     return None
 
@@ -427,187 +582,218 @@ def calculate_overall_stats(lap_stats):
     """
     Calculate overall statistics across all laps.
     """
-    stats = {}
+    # Calculate means for all numeric columns in one pass, skipping the lap number
+    means = lap_stats.drop(columns="Lap", errors='ignore').select_dtypes(include=['float64', 'int64']).mean().round(2)
+    
+    return {f"Average {column}": value for column, value in means.items()}
+
+@functools.lru_cache(maxsize=None)
+def _cached_figure(width, height, ncols=1, dpi=100):
+    """
+    Create a figure of the given size (inches) with ncols side-by-side axes, once per process.
+    The figure is not registered with pyplot, so it is cleared between plots rather than closed.
+    Constrained layout fits the labels inside the figure, so the image is exactly width x height
+    and matches the box it is drawn in on the PDF page.
+    Importing matplotlib here means stats-only callers never load it.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(width, height), dpi=dpi, layout='constrained')
+    FigureCanvasAgg(fig)
+    fig.subplots(1, ncols)
+    return fig
+
+def _reuse_figure(width, height, ncols=1, dpi=100):
+    """
+    Return a cached figure of the given size with its axes cleared, and its axes
+    (a single axes when ncols is 1, otherwise a tuple).
+    """
+    fig = _cached_figure(width, height, ncols, dpi)
+    for ax in fig.axes:
+        ax.cla()
+    return fig, fig.axes[0] if ncols == 1 else tuple(fig.axes)
+
+def _render_figure(fig, png_path=None):
+    """
+    Render a figure with its Agg canvas (at the figure's own DPI).
+    Writes a PNG straight to png_path and returns it if given, otherwise returns a bytes buffer
+    holding the pixels as an uncompressed PPM image.
+    Either way the image is only an intermediate - reportlab decodes it and recompresses the pixels
+    into the PDF - so PNG files are saved with the fastest zlib level, and buffers, which never
+    leave the process, are not compressed at all.
+    The figures are opaque, so the alpha channel is dropped: with an RGBA image reportlab splits
+    out the alpha, hashes it and embeds it as a second (soft mask) image on every plot.
+    """
+    from PIL import Image as PILImage
+    fig.canvas.draw()
+    rgba = fig.canvas.buffer_rgba()
+    image = PILImage.frombuffer('RGBA', (rgba.shape[1], rgba.shape[0]), rgba, 'raw', 'RGBA', 0, 1).convert('RGB')
     
-    # Calculate means for all numeric columns
-    for column in lap_stats.select_dtypes(include=['float64', 'int64']).columns:
-        if column != "Lap":  # Skip the lap number
-            stats[f"Average {column}"] = round(lap_stats[column].mean(), 2)
+    if png_path:
+        image.save(png_path, format='png', **PNG_SAVE_KWARGS)
+        return png_path
     
-    return stats
+    buf = io.BytesIO()
+    image.save(buf, format='ppm')
+    buf.seek(0)
+    return buf
 
-def create_stroke_by_stroke_plot(events, lap_start, lap_end, lap_number, breakout_times=None):
+def _linear_fit(x, y):
+    """
+    Return the (slope, intercept) of the least squares line through the points x, y.
+    Closed form for a straight line, so no general polynomial fit is needed.
+    A flat line through the mean is returned when all x are the same.
+    """
+    x_mean = x.mean()
+    y_mean = y.mean()
+    dx = x - x_mean
+    dx_squared = np.dot(dx, dx)
+    slope = np.dot(dx, y - y_mean) / dx_squared if dx_squared > 0 else 0.0
+    return slope, y_mean - slope * x_mean
+
+def _label_points(ax, xs, ys, labels, offset=5, **text_kwargs):
+    """
+    Write each label centred offset points above its (x, y) data point.
+    Plain text on one shared offset transform draws the same as an annotation per point,
+    but without building and updating an annotation artist for each one.
+    """
+    from matplotlib.transforms import offset_copy
+    label_transform = offset_copy(ax.transData, fig=ax.figure, x=0, y=offset, units='points')
+    for x, y, label in zip(xs, ys, labels):
+        ax.text(x, y, label, transform=label_transform, ha='center', **text_kwargs)
+
+def create_stroke_by_stroke_plot(lap_stroke_times, lap_number, breakout_times=None, png_path=None):
     """
     Create a plot showing individual stroke rates for a single lap.
+    lap_stroke_times is a sorted array of the times of the strokes in this lap.
     X-axis is stroke number, Y-axis is stroke rate (strokes/second).
     Includes a line of best fit to show trend.
+    Writes the PNG to png_path and returns the path if given, otherwise returns a bytes buffer.
     """
-    # Get all strokes in this lap
-    lap_strokes = [e for e in events 
-                  if e['type'] == 'stroke' 
-                  and lap_start <= e['time'] <= lap_end]
-    
-    # Sort strokes by time
-    lap_strokes.sort(key=lambda x: x['time'])
-    
-    debug_print(f"Lap {lap_number}: Found {len(lap_strokes)} strokes")
+    fig, ax = _reuse_figure(LAP_PLOT_WIDTH / 72, LAP_PLOT_HEIGHT / 72, dpi=LAP_PLOT_DPI)
+
+    debug_print(f"Lap {lap_number}: Found {len(lap_stroke_times)} strokes")
     
     # If we have fewer than 2 strokes, we can't calculate rates
-    if len(lap_strokes) < 2:
+    if len(lap_stroke_times) < 2:
         debug_print(f"  Lap {lap_number}: Not enough strokes to calculate rates")
         # Create an empty plot
-        plt.figure(figsize=(5, 4))
-        plt.title(f'Lap {lap_number}: Stroke Rate')
-        plt.xlabel('Stroke Number')
-        plt.ylabel('Stroke Rate (strokes/second)')
-        plt.grid(True, alpha=0.3)
-        plt.text(0.5, 0.5, 'Not enough strokes to calculate rates', 
-                ha='center', va='center', transform=plt.gca().transAxes)
-        
-        # Save to bytes buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        plt.close()
-        buf.seek(0)
-        return buf
+        ax.set_title(f'Lap {lap_number}: Stroke Rate')
+        ax.set_xlabel('Stroke Number')
+        ax.set_ylabel('Stroke Rate (strokes/second)')
+        ax.grid(True, alpha=0.3)
+        ax.text(0.5, 0.5, 'Not enough strokes to calculate rates', 
+                ha='center', va='center', transform=ax.transAxes)
+        
+        # Save to the PNG file or a bytes buffer
+        return _render_figure(fig, png_path)
     
     # Extract stroke times
-    stroke_times = [s['time'] for s in lap_strokes]
+    stroke_times = lap_stroke_times.tolist()
     
     # Calculate individual stroke rates (time between consecutive strokes)
-    stroke_numbers = list(range(1, len(stroke_times)))
-    stroke_rates = []
-    
-    for i in range(1, len(stroke_times)):
-        time_diff = stroke_times[i] - stroke_times[i-1]
-        rate = 1.0 / time_diff if time_diff > 0 else 0
-        stroke_rates.append(rate)
-        debug_print(f"    Stroke {i+1} at {stroke_times[i]:.2f}: Rate = {rate:.2f} strokes/sec")
-    
-    # Create plot
-    plt.figure(figsize=(5, 4))
+    # (kept as arrays for the plot and the fit, and as lists for the labels)
+    stroke_number_array = np.arange(1, len(stroke_times))
+    time_diffs = np.diff(lap_stroke_times)
+    stroke_rate_array = np.divide(1.0, time_diffs, out=np.zeros_like(time_diffs), where=time_diffs > 0)
+    stroke_numbers = stroke_number_array.tolist()
+    stroke_rates = stroke_rate_array.tolist()
+    
+    # Log all the lap's stroke rates in one line rather than one print per stroke
+    if DEBUG_MODE:
+        debug_print("\n".join(f"    Stroke {i+1} at {stroke_times[i]:.2f}: Rate = {rate:.2f} strokes/sec"
+                              for i, rate in enumerate(stroke_rates, start=1)))
     
     # Scatter plot of individual stroke rates
-    plt.scatter(stroke_numbers, stroke_rates, color='green', s=40)
+    ax.scatter(stroke_number_array, stroke_rate_array, color='green', s=40)
     
     # Add line of best fit if we have enough points
     if len(stroke_rates) >= 2:
         # Calculate line of best fit
-        x = np.array(stroke_numbers)
-        y = np.array(stroke_rates)
-        m, b = np.polyfit(x, y, 1)
-        plt.plot(x, m*x + b, color='blue', linestyle='--')
+        m, b = _linear_fit(stroke_number_array, stroke_rate_array)
+        ax.plot(stroke_number_array, m*stroke_number_array + b, color='blue', linestyle='--')
     
     # Add data labels
-    for i, rate in enumerate(stroke_rates):
-        plt.annotate(f"{rate:.2f}", 
-                    (stroke_numbers[i], rate),
-                    xytext=(0, 5), textcoords='offset points',
-                    ha='center', fontsize=8)
+    _label_points(ax, stroke_numbers, stroke_rates, [f"{rate:.2f}" for rate in stroke_rates], fontsize=8)
     
-    plt.title(f'Lap {lap_number}: Stroke Rate')
-    plt.xlabel('Stroke Number')
-    plt.ylabel('Stroke Rate (strokes/second)')
-    plt.grid(True, alpha=0.3)
+    ax.set_title(f'Lap {lap_number}: Stroke Rate')
+    ax.set_xlabel('Stroke Number')
+    ax.set_ylabel('Stroke Rate (strokes/second)')
+    ax.grid(True, alpha=0.3)
     
     # Set reasonable y-axis limits
     if stroke_rates:
         max_rate = max(stroke_rates)
         min_rate = min(stroke_rates)
         buffer = (max_rate - min_rate) * 0.1 if max_rate > min_rate else 0.2
-        plt.ylim(max(0, min_rate - buffer), max_rate + buffer)
+        ax.set_ylim(max(0, min_rate - buffer), max_rate + buffer)
     
-    # Save to bytes buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close()
-    buf.seek(0)
-    
-    return buf
+    # Save to the PNG file or a bytes buffer
+    return _render_figure(fig, png_path)
 
 def create_continuous_stroke_graph(data, race_details):
     """
     Create a continuous stroke graph showing stroke rate across all laps.
     Returns a bytes buffer containing the image.
     """
-    events = data.get('events', [])
-    
-    # Get stroke events
-    stroke_events = [e for e in events if e['type'] == 'stroke']
+    # Get stroke times in order
+    stroke_times = _sorted_times_by_type(data)[EventType.STROKE]
     
-    if not stroke_events:
+    if stroke_times.size == 0:
         # Create an empty plot with a message if no stroke data
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = _reuse_figure(10, 6)
         ax.text(0.5, 0.5, 'No stroke data available', 
                ha='center', va='center', transform=ax.transAxes, fontsize=14)
         ax.axis('off')
     else:
-        # Get stroke and distance
-        stroke = race_details['stroke'].value
-        
-        # Convert distance to integer if it's a string
-        distance = race_details['distance'].value
-        if isinstance(distance, str):
-            distance = int(distance)
-        
-        # Calculate lap markers using the new function
-        lap_markers, _ = calculate_lap_markers(events, stroke, distance)
+        # Get the lap markers (shared with the lap stats)
+        lap_markers, _ = race_lap_markers(data, race_details)
         
         # Create the plot
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = _reuse_figure(10, 6)
         
         # Calculate stroke rate over time
-        # Group strokes by lap
-        lap_strokes = []
-        for i in range(len(lap_markers) - 1):
-            lap_start = lap_markers[i]
-            lap_end = lap_markers[i + 1]
-            lap_stroke_events = [e for e in stroke_events if lap_start <= e['time'] <= lap_end]
-            lap_strokes.append(lap_stroke_events)
-        
-        # Calculate stroke rate for each stroke
-        stroke_rates = []
-        for lap_idx, lap_stroke_events in enumerate(lap_strokes):
-            if len(lap_stroke_events) < 2:
-                continue
-                
-            # Calculate time between consecutive strokes
-            for i in range(len(lap_stroke_events) - 1):
-                time1 = lap_stroke_events[i]['time']
-                time2 = lap_stroke_events[i + 1]['time']
-                if time2 > time1:  # Ensure valid time difference
-                    stroke_time = time2 - time1
-                    stroke_rate = 1.0 / stroke_time if stroke_time > 0 else 0
-                    stroke_rates.append((time1, stroke_rate))
+        # Locate each lap's strokes in the sorted stroke times (lap boundaries are inclusive)
+        lap_starts = np.searchsorted(stroke_times, lap_markers[:-1], side='left')
+        lap_ends = np.searchsorted(stroke_times, lap_markers[1:], side='right')
+        
+        # The rate of each stroke is one over the time to the next stroke in the same lap,
+        # so take the index of every stroke that has a next stroke in its lap, lap after lap
+        pair_counts = np.maximum(lap_ends - lap_starts - 1, 0)
+        pair_offsets = np.cumsum(pair_counts) - pair_counts
+        pair_indices = np.arange(pair_counts.sum()) + np.repeat(lap_starts - pair_offsets, pair_counts)
+        stroke_gaps = stroke_times[pair_indices + 1] - stroke_times[pair_indices]
+        valid = stroke_gaps > 0  # Ensure valid time difference
+        times = stroke_times[pair_indices][valid]
+        rates = 1.0 / stroke_gaps[valid]
         
         # Plot stroke rates as green dots
-        times, rates = zip(*stroke_rates) if stroke_rates else ([], [])
         ax.scatter(times, rates, color='green', s=50, alpha=0.7)
         
         # Add data labels for stroke rates
-        for time, rate in stroke_rates:
-            ax.annotate(f"{rate:.2f}", 
-                       (time, rate),
-                       xytext=(0, 5), textcoords='offset points',
-                       ha='center', fontsize=8)
+        rate_list = rates.tolist()
+        _label_points(ax, times.tolist(), rate_list, [f"{rate:.2f}" for rate in rate_list], fontsize=8)
         
         # Add a trend line
-        if stroke_rates:
-            z = np.polyfit(times, rates, 1)
-            p = np.poly1d(z)
-            ax.plot(times, p(times), "b--", alpha=0.7)
-        
-        # Add lap markers as vertical red lines
-        for i, marker in enumerate(lap_markers):
+        if rates.size:
+            m, b = _linear_fit(times, rates)
+            ax.plot(times, m*times + b, "b--", alpha=0.7)
+        
+        # Add lap markers as vertical red lines, drawn as one collection spanning the axes height
+        ax.vlines(lap_markers, 0, 1, transform=ax.get_xaxis_transform(),
+                  colors='red', linestyles='-', linewidth=1)
+        
+        # The markers don't change the y limits, so the label height is looked up once
+        label_y = ax.get_ylim()[1] * 0.95
+        last_marker = len(lap_markers) - 1
+        for i, marker in enumerate(lap_markers.tolist()):
             if i == 0:
                 label = "Start"
-            elif i == len(lap_markers) - 1:
+            elif i == last_marker:
                 label = "Finish"
             else:
                 label = f"Lap {i}"
-            
-            ax.axvline(x=marker, color='red', linestyle='-', linewidth=1)
-            ax.text(marker, ax.get_ylim()[1] * 0.95, label, 
+            ax.text(marker, label_y, label, 
                    ha='center', va='top', fontsize=8, color='red', fontweight='bold')
         
         # Set titles and labels
@@ -619,39 +805,30 @@ def create_continuous_stroke_graph(data, race_details):
         ax.grid(True, alpha=0.3)
         
         # Adjust the plot to show all data
-        if lap_markers:
+        if len(lap_markers):
             ax.set_xlim(0, lap_markers[-1] * 1.02)  # Add a little padding
     
-    plt.tight_layout()
-    
     # Save to bytes buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    
-    return buf
+    return _render_figure(fig)
 
-def create_stroke_by_stroke_analysis_elements(data, race_details):
+def create_stroke_by_stroke_analysis_elements(data, race_details, plot_dir):
     """
     Create stroke-by-stroke analysis elements for the PDF.
+    The lap plots are written as PNG files to plot_dir, which must exist until the PDF is built.
     Returns a list of flowable elements to add to the PDF.
     """
     elements = []
     
-    # Get events
-    events = data.get('events', [])
-    
-    # Get stroke and distance
-    stroke = race_details['stroke'].value
+    # Get stroke times in order
+    stroke_times = _sorted_times_by_type(data)[EventType.STROKE]
     
-    # Convert distance to integer if it's a string
-    distance = race_details['distance'].value
-    if isinstance(distance, str):
-        distance = int(distance)
+    # Nothing to plot without strokes
+    if len(stroke_times) == 0:
+        debug_print("DEBUG: No strokes found, skipping stroke-by-stroke plots")
+        return elements
     
-    # Calculate lap markers using the new function
-    lap_markers, _ = calculate_lap_markers(events, stroke, distance)
+    # Get the lap markers (shared with the lap stats)
+    lap_markers, _ = race_lap_markers(data, race_details)
     
     # Get breakout times if available
     breakout_times = data.get('breakout_times', None)
@@ -660,70 +837,47 @@ def create_stroke_by_stroke_analysis_elements(data, race_details):
     num_laps = len(lap_markers) - 1  # Calculate actual number of laps
     
     debug_print(f"DEBUG: Creating stroke-by-stroke plots for {num_laps} laps")
+    if num_laps <= 0:
+        return elements
     
-    # Generate all plots first
-    all_plots = []
-    for lap in range(num_laps):
-        lap_start = lap_markers[lap]
-        lap_end = lap_markers[lap + 1]
-        
-        # Create the plot for this lap
-        stroke_plot_buf = create_stroke_by_stroke_plot(events, lap_start, lap_end, lap + 1, breakout_times)
-        
-        # Create a paragraph for the lap title
-        lap_title = Paragraph(f"Lap {lap+1}", ParagraphStyle(
-            'Title',
-            fontSize=10,
-            fontName='Helvetica-Bold',
-            alignment=0,
-            spaceAfter=4
-        ))
-        
-        # Create the image
-        stroke_plot_img = Image(stroke_plot_buf, width=250, height=200)
-        
-        # Add both to the list
-        all_plots.append((lap_title, stroke_plot_img))
+    from reportlab.platypus import Table, PageBreak, Paragraph, Image
+    
+    styles = _report_styles()
+    
+    # Locate each lap's strokes in the sorted stroke times (lap boundaries are inclusive)
+    lap_starts = np.searchsorted(stroke_times, lap_markers[:-1], side='left')
+    lap_ends = np.searchsorted(stroke_times, lap_markers[1:], side='right')
+    
+    # Render each lap plot straight to a PNG file, from that lap's strokes
+    plot_paths = [
+        create_stroke_by_stroke_plot(stroke_times[lap_starts[lap]:lap_ends[lap]], lap + 1, breakout_times,
+                                     os.path.join(plot_dir, f"lap_{lap + 1}.png"))
+        for lap in range(num_laps)
+    ]
+    
+    # Each cell is the lap title above the plot image, read from the PNG on disk
+    cells = [
+        [Paragraph(f"Lap {lap_number}", styles['lap_title']),
+         Image(plot_path, width=LAP_PLOT_WIDTH, height=LAP_PLOT_HEIGHT)]
+        for lap_number, plot_path in enumerate(plot_paths, start=1)
+    ]
     
     # Now arrange the plots in a grid, 2x2 per page
-    for i in range(0, len(all_plots), 4):
-        # Take up to 4 plots for this page
-        page_plots = all_plots[i:i+4]
-        
-        # Create a table for this page
-        data = []
-        
-        # Add plots to the table, 2 per row
-        for j in range(0, len(page_plots), 2):
-            row_plots = page_plots[j:j+2]
-            row = []
-            
-            for title, img in row_plots:
-                # Create a container for these elements
-                container = []
-                container.append(title)
-                container.append(img)
-                row.append(container)
-            
-            # Pad with empty cells if needed
-            while len(row) < 2:
-                row.append("")
-                
-            data.append(row)
+    for i in range(0, len(cells), 4):
+        # Take up to 4 plots for this page, 2 per row, padding the last row with an empty cell
+        page_cells = cells[i:i+4]
+        data = [page_cells[j:j+2] for j in range(0, len(page_cells), 2)]
+        if len(data[-1]) < 2:
+            data[-1].append("")
         
         # Create the table
         plot_table = Table(data, colWidths=[275, 275])
-        plot_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ]))
+        plot_table.setStyle(styles['plot_table'])  # All the page tables share one style
         
         elements.append(plot_table)
         
         # Add a page break after each table (except the last one)
-        if i + 4 < len(all_plots):
+        if i + 4 < len(cells):
             elements.append(PageBreak())
     
     return elements
@@ -767,6 +921,30 @@ def prepare_report_file(race_details, base_directory):
         
     return data_paths, pdf_filepath
 
+def read_break_fifteen_csv(csv_path):
+    """
+    Read a breakout and fifteen CSV into a dict of float arrays, keyed as in BREAK_FIFTEEN_KEYS.
+    The file only has a row per lap, so it is parsed with the csv module rather than through a DataFrame.
+    Blank and NA cells are NaN, as pandas would read them, and blank lines are skipped.
+    A UTF-8 byte order mark before the header is dropped, as pandas does.
+    """
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = [row for row in reader if row]
+    
+    columns = {}
+    for key, names in BREAK_FIFTEEN_KEYS.items():
+        # Take the singular spelling of the column if both are present
+        index = next((header.index(name) for name in names if name in header), None)
+        if index is not None:
+            cells = [row[index].strip() if index < len(row) else '' for row in rows]
+            columns[key] = np.array([
+                float(cell) if cell and cell not in BREAK_FIFTEEN_NA_VALUES else np.nan
+                for cell in cells
+            ])
+    return columns
+
 def run(race_details, base_directory):
     """
     Main function to run the reporting process.
@@ -777,26 +955,17 @@ def run(race_details, base_directory):
         base_directory = base_directory[5:]  # Remove 'data/' prefix
     data_dir = os.path.join('data', base_directory)
     
-    # Create the reports directory
+    # Create the reports directory with the same structure as the data
+    # For example, if base_directory is "Big12's/Day2", we want "reports/Big12's/Day2/finals"
     reports_dir = os.path.join("reports", base_directory, race_details['session'].value)
     os.makedirs(reports_dir, exist_ok=True)
     # Print debug info about reports directory
     debug_print(f"DEBUG: Reports directory: {reports_dir}")
     
-    # Construct the filename pattern for searching
-    swimmer_name = race_details['swimmer_name'].replace(' ', '_')
-    gender = race_details['gender'].value
-    
-    # Include relay 
-    relay_part = ""
-    if race_details.get('relay', False):
-        relay_part = "relay_"
-    
-    distance = str(race_details['distance'].value)
-    stroke = race_details['stroke'].value
-    
-    # Create the filename pattern
-    filename_pattern = f"{swimmer_name}_{gender}_{relay_part}{distance}_{stroke}.csv"
+    # Create the filename pattern (relay races include "relay_")
+    relay_part = "relay_" if race_details.get('relay', False) else ""
+    filename_pattern = (f"{race_details['swimmer_name'].replace(' ', '_')}_{race_details['gender'].value}_"
+                        f"{relay_part}{race_details['distance'].value}_{race_details['stroke'].value}.csv")
     
     # Find the stroke and turn data file
     stroke_turn_dir = os.path.join(data_dir, "stroke_and_turn", race_details['session'].value)
@@ -813,67 +982,45 @@ def run(race_details, base_directory):
         debug_print(f"Error: Stroke and turn data file not found: {stroke_turn_file}")
         return
     
+    # The filename pattern always ends in .csv, so only that suffix is swapped
+    report_filename = filename_pattern[:-4] + '.pdf'
+    report_filepath = os.path.join(reports_dir, report_filename)
+    
     # Load the data
     data = {}
     
     # Load stroke and turn data
     stroke_turn_data = pd.read_csv(stroke_turn_file)
     
-    # Print column names for debugging
-    debug_print(f"DEBUG: CSV columns: {stroke_turn_data.columns.tolist()}")
+    # Print column names for debugging (the list is only built when debugging)
+    if DEBUG_MODE:
+        debug_print(f"DEBUG: CSV columns: {stroke_turn_data.columns.tolist()}")
     
-    # Convert to events list
-    events = []
-    for _, row in stroke_turn_data.iterrows():
-        event_type = row['type'] if 'type' in stroke_turn_data.columns else row['event_type']
-        events.append({
-            'type': event_type,
-            'time': row['time']
-        })
+    # Keep events as parallel arrays of times and integer type codes
+    type_column = 'type' if 'type' in stroke_turn_data.columns else 'event_type'
+    event_times = stroke_turn_data['time'].to_numpy(dtype=float)
+    event_types = stroke_turn_data[type_column]
     
-    data['events'] = events
-    data['stroke'] = stroke
+    data['event_times'] = _read_only(event_times)
+    data['event_codes'] = _read_only(encode_event_types(event_types))
+    data['stroke'] = race_details['stroke'].value
     
     # Load breakout and fifteen data if available
     if os.path.exists(break_fifteen_file):
-        break_fifteen_data = pd.read_csv(break_fifteen_file)
+        break_fifteen_data = read_break_fifteen_csv(break_fifteen_file)
         
         # Check column names
-        debug_print(f"DEBUG: Breakout CSV columns: {break_fifteen_data.columns.tolist()}")
-        
-        # Add each column to data - check for both singular and plural forms
-        if 'breakout_time' in break_fifteen_data.columns:
-            data['breakout_times'] = break_fifteen_data['breakout_time'].tolist()
-        elif 'breakout_times' in break_fifteen_data.columns:
-            data['breakout_times'] = break_fifteen_data['breakout_times'].tolist()
-        
-        if 'breakout_distance' in break_fifteen_data.columns:
-            data['breakout_distances'] = break_fifteen_data['breakout_distance'].tolist()
-        elif 'breakout_distances' in break_fifteen_data.columns:
-            data['breakout_distances'] = break_fifteen_data['breakout_distances'].tolist()
+        if DEBUG_MODE:
+            debug_print(f"DEBUG: Breakout data columns: {list(break_fifteen_data)}")
         
-        if 'fifteen_time' in break_fifteen_data.columns:
-            data['fifteen_times'] = break_fifteen_data['fifteen_time'].tolist()
-        elif 'fifteen_times' in break_fifteen_data.columns:
-            data['fifteen_times'] = break_fifteen_data['fifteen_times'].tolist()
+        # Each column is already a float array, under its data key
+        data.update(break_fifteen_data)
     
     # Calculate statistics
     lap_stats = calculate_per_lap_stats(data, race_details)
     overall_stats = calculate_overall_stats(lap_stats)
     
     # Generate the report
-    report_filename = filename_pattern.replace('.csv', '.pdf')
-    
-    # Create the report directory with the same structure as the data
-    # For example, if base_directory is "data/Big12's/Day2", we want "reports/Big12's/Day2/finals"
-    # Strip off "data/" prefix if present
-    clean_base_dir = base_directory.replace('data/', '').replace('data\\', '')
-    report_dir = os.path.join("reports", clean_base_dir, race_details['session'].value)
-    # Create the directory if it doesn't exist
-    os.makedirs(report_dir, exist_ok=True)
-    
-    report_filepath = os.path.join(report_dir, report_filename)
-    
     generate_pdf_report(lap_stats, overall_stats, report_filepath, race_details, data)
     
     debug_print(f"Report generated: {report_filepath}")
@@ -885,6 +1032,11 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
     All speeds and distances are in yards/second and yards respectively.
     Handles cases where breakout/fifteen data might be missing.
     """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, PageBreak, Spacer, Paragraph, Image
+    from reportlab import rl_config
+    
     doc = SimpleDocTemplate(
         filepath, 
         pagesize=letter,
@@ -894,6 +1046,7 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
         bottomMargin=40
     )
     elements = []
+    plot_dir = None  # Temporary directory for the lap plot PNGs, if any
     
     # Get folder name from filepath - use the user-created directory
     folder_parts = filepath.split(os.sep)
@@ -909,21 +1062,9 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
     race_string = f"{race_details['gender'].value.capitalize()} {relay_text}{race_details['distance'].value}yd {race_details['stroke'].value.capitalize()} {race_details['session'].value.capitalize()}"
     
     # Create a Paragraph for each line of race info with left alignment
-    title_style = ParagraphStyle(
-        'Title',
-        fontSize=12,
-        fontName='Helvetica-Bold',
-        alignment=0,  # 0 = left, 1 = center, 2 = right
-        spaceAfter=6  # Increased spacing after the title
-    )
-    
-    info_style = ParagraphStyle(
-        'Info',
-        fontSize=9,
-        fontName='Helvetica',
-        alignment=0,
-        spaceAfter=2  # Increased spacing after each info line
-    )
+    styles = _report_styles()
+    title_style = styles['title']
+    info_style = styles['info']
     
     # Add race details as left-aligned paragraphs
     elements.append(Paragraph(race_details['swimmer_name'], title_style))
@@ -939,133 +1080,47 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
         is_free_or_back = race_details['stroke'].value in ["freestyle", "backstroke"]
         
         # Define columns based on available data
-        if has_breakout_data:
-            if is_free_or_back:
-                columns = [
-                    "Lap", "Break Time", "Break->15", "15->Turn", "Strk->Wall",
-                    "Lap Time", "Break Dist", "UW Speed", "OW Speed", "Strk Count", "Strk/Sec"
-                ]
-            else:
-                columns = [
-                    "Lap", "Break Time", "Break->15", "15->Turn", "Strk->Wall",
-                    "Turn Time", "Lap Time", "Break Dist", "UW Speed", "OW Speed", "Strk Count", "Strk/Sec"
-                ]
-        else:
-            if is_free_or_back:
-                columns = [
-                    "Lap", "Strk->Wall", "Lap Time", "Strk Count", "Strk/Sec"
-                ]
-            else:
-                columns = [
-                    "Lap", "Strk->Wall", "Turn Time", "Lap Time", "Strk Count", "Strk/Sec"
-                ]
-        
-        # Format integers, ignoring NaN values
-        lap_stats["Lap"] = lap_stats["Lap"].fillna(0).astype(int)
-        lap_stats["Stroke Count"] = lap_stats["Stroke Count"].fillna(0).astype(int)
+        layout = (has_breakout_data, is_free_or_back)
+        columns = STATS_TABLE_COLUMNS[layout]
         
         # Create combined data table with new column order
-        data_table = [columns]  # Header row
+        data_table = [list(columns)]  # Header row
         
         # Determine which cells need asterisks
         last_lap_index = lap_stats["Lap"].max()
         
-        # Create a mapping of column names to indices for easier reference
-        column_indices = {col: idx for idx, col in enumerate(columns)}
+        # Mapping of column names to indices for easier reference
+        column_indices = STATS_TABLE_COLUMN_INDICES[layout]
+        
+        # Pull each table column out of lap_stats once, in table order
+        # (columns left out of lap_stats because they have no values are blank)
+        stat_keys = STATS_TABLE_STAT_KEYS[layout]
+        lap_values = {key: lap_stats[key].tolist() for key in stat_keys if key in lap_stats.columns}
+        # Lap and Stroke Count are integer columns; laps without strokes have no count and show 0
+        if "Stroke Count" in lap_values:
+            lap_values["Stroke Count"] = lap_stats["Stroke Count"].fillna(0).tolist()
+        blank_column = [""] * len(lap_stats)
+        
+        data_rows = [list(cells) for cells in zip(*(lap_values.get(key, blank_column) for key in stat_keys))]
+        
+        # Add asterisks to the few footnoted cells rather than checking every row:
+        # UW Speed on lap 1 gets a double asterisk, Stroke to Wall and 15->Turn on the last lap one
+        lap_numbers = lap_stats["Lap"].to_numpy()
+        for lap, col, marker in ((1, "UW Speed", "**"),
+                                 (last_lap_index, "Strk->Wall", "*"),
+                                 (last_lap_index, "15->Turn", "*")):
+            col_idx = column_indices.get(col)
+            if col_idx is None or STATS_TABLE_KEYS.get(col, col) not in lap_values:
+                continue
+            for row_idx in np.flatnonzero(lap_numbers == lap):
+                value = data_rows[row_idx][col_idx]
+                if pd.notna(value):
+                    data_rows[row_idx][col_idx] = f"{value}{marker}"
         
-        for _, row in lap_stats.iterrows():
-            lap_num = int(row["Lap"])
-            
-            # Prepare data row based on available columns and stroke type
-            if has_breakout_data:
-                if is_free_or_back:
-                    data_row = [
-                        lap_num,
-                        row.get("Breakout Time", ""),
-                        row.get("Break->15", ""),
-                        row.get("15->Turn", ""),
-                        row.get("Stroke to Wall", ""),
-                        row.get("Lap Time", ""),
-                        row.get("Breakout Dist", ""),
-                        row.get("UW Speed", ""),
-                        row.get("OW Speed", ""),
-                        int(row.get("Stroke Count", 0)) if pd.notna(row.get("Stroke Count")) else "",
-                        row.get("Strokes per Second", "")
-                    ]
-                else:
-                    data_row = [
-                        lap_num,
-                        row.get("Breakout Time", ""),
-                        row.get("Break->15", ""),
-                        row.get("15->Turn", ""),
-                        row.get("Stroke to Wall", ""),
-                        row.get("Turn Time", ""),
-                        row.get("Lap Time", ""),
-                        row.get("Breakout Dist", ""),
-                        row.get("UW Speed", ""),
-                        row.get("OW Speed", ""),
-                        int(row.get("Stroke Count", 0)) if pd.notna(row.get("Stroke Count")) else "",
-                        row.get("Strokes per Second", "")
-                    ]
-            else:
-                if is_free_or_back:
-                    data_row = [
-                        lap_num,
-                        row.get("Stroke to Wall", ""),
-                        row.get("Lap Time", ""),
-                        int(row.get("Stroke Count", 0)) if pd.notna(row.get("Stroke Count")) else "",
-                        row.get("Strokes per Second", "")
-                    ]
-                else:
-                    data_row = [
-                        lap_num,
-                        row.get("Stroke to Wall", ""),
-                        row.get("Turn Time", ""),
-                        row.get("Lap Time", ""),
-                        int(row.get("Stroke Count", 0)) if pd.notna(row.get("Stroke Count")) else "",
-                        row.get("Strokes per Second", "")
-                    ]
-            
-            # Add asterisks to specific cells using column indices
-            if lap_num == 1 and "UW Speed" in column_indices and pd.notna(row.get("UW Speed")):
-                # Double asterisk for UW Speed in lap 1
-                uw_speed_idx = column_indices["UW Speed"]
-                if uw_speed_idx < len(data_row):
-                    data_row[uw_speed_idx] = f"{data_row[uw_speed_idx]}**"
-            
-            if lap_num == last_lap_index:
-                # Stroke to Wall on last lap gets an asterisk
-                if "Strk->Wall" in column_indices and pd.notna(row.get("Stroke to Wall")):
-                    strk_wall_idx = column_indices["Strk->Wall"]
-                    if strk_wall_idx < len(data_row):
-                        data_row[strk_wall_idx] = f"{data_row[strk_wall_idx]}*"
-                
-                # 15->Turn on last lap gets an asterisk
-                if "15->Turn" in column_indices and pd.notna(row.get("15->Turn")):
-                    fifteen_turn_idx = column_indices["15->Turn"]
-                    if fifteen_turn_idx < len(data_row):
-                        data_row[fifteen_turn_idx] = f"{data_row[fifteen_turn_idx]}*"
-            
-            data_table.append(data_row)
-        
-        # Add averages row
-        avg_row = ["AVG"]
-        for col in columns[1:]:  # Skip the "Lap" column
-            col_key = col
-            if col == "Break Time":
-                col_key = "Breakout Time"
-            elif col == "Break Dist":
-                col_key = "Breakout Dist"
-            elif col == "Strk Count":
-                col_key = "Stroke Count"
-            elif col == "Strk/Sec":
-                col_key = "Strokes per Second"
-            elif col == "Strk->Wall":
-                col_key = "Stroke to Wall"
-            
-            avg_key = f"Average {col_key}"
-            avg_value = overall_stats.get(avg_key, "")
-            avg_row.append(avg_value)
+        data_table.extend(data_rows)
+        
+        # Add averages row, looked up by the lap_stats keys already in table order (skipping "Lap")
+        avg_row = ["AVG"] + [overall_stats.get(f"Average {key}", "") for key in stat_keys[1:]]
         
         data_table.append(avg_row)
         
@@ -1079,33 +1134,21 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
         # Create and style table
         table = Table(data_table, colWidths=col_widths)
         
-        # Basic table styling
-        table_style = [
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),  # Smaller font size
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),  # Standard thin grid
-            ('TOPPADDING', (0, 0), (-1, -1), 1),  # Minimal padding
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),  # Header row background
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),  # Header row text color
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # Header row bold
-        ]
+        # Basic table styling (shared), plus the rules that depend on this table's columns and rows
+        table_style = list(styles['stats_table'])
         
         # Add thicker vertical lines around Lap Time column
         lap_time_idx = column_indices.get("Lap Time")
         if lap_time_idx is not None:
-            for row in range(len(data_table)):
-                # Left border of Lap Time column
-                table_style.append(('LINEAFTER', (lap_time_idx-1, row), (lap_time_idx-1, row), 1.5, colors.black))
-                # Right border of Lap Time column
-                table_style.append(('LINEAFTER', (lap_time_idx, row), (lap_time_idx, row), 1.5, colors.black))
+            # Left border of Lap Time column, all rows
+            table_style.append(('LINEAFTER', (lap_time_idx-1, 0), (lap_time_idx-1, -1), 1.5, colors.black))
+            # Right border of Lap Time column, all rows
+            table_style.append(('LINEAFTER', (lap_time_idx, 0), (lap_time_idx, -1), 1.5, colors.black))
         
         # Add thicker line after UW Speed column if it exists
         uw_speed_idx = column_indices.get("UW Speed")
         if uw_speed_idx is not None:
-            for row in range(len(data_table)):
-                table_style.append(('LINEAFTER', (uw_speed_idx, row), (uw_speed_idx, row), 1.5, colors.black))
+            table_style.append(('LINEAFTER', (uw_speed_idx, 0), (uw_speed_idx, -1), 1.5, colors.black))
         
         # Style the averages row
         avg_row_index = len(data_table) - 1
@@ -1125,58 +1168,16 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
                "Underwater speed is breakout distance/breakout time. Overwater speed is (25-breakout-0.5)/(last stroke time-breakout time). " \
                "* indicates exceptional value due to race finish. ** indicates first lap underwater speed affected by dive/start."
         
-        note_style = ParagraphStyle(
-            'Note',
-            fontSize=7,
-            fontName='Helvetica-Oblique'
-        )
+        note_style = styles['note']
         debug_print(f"DEBUG: Extracting user folder from filepath: {filepath}")
         elements.append(Paragraph(note, note_style))
         
         # Add variable descriptions
         elements.append(Spacer(1, 8))
         
-        description_style = ParagraphStyle(
-            'Description',
-            fontSize=7,
-            fontName='Helvetica',
-            leading=9  # Line spacing
-        )
-        
-        descriptions = [
-            "Break Time: Time from wall/start to breakout (seconds)",
-            "Break->15: Time from breakout to 15m mark (seconds)", 
-            "15->Turn: Time from 15m mark to next turn/finish (seconds)",
-            "Strk->Wall: Time from last stroke to wall (seconds)",
-            "Turn Time: Time from hand touch to push off (seconds)",
-            "Lap Time: Total time for the lap (seconds)",
-            "Break Dist: Distance travelled underwater (yards)",
-            "UW Speed: Underwater speed (yards/second)",
-            "OW Speed: Overwater speed (yards/second)",
-            "Strk Count: Number of strokes in the lap (strokes)",
-            "Strk/Sec: Stroke rate (strokes per second)"
-        ]
-        
-        # Create a multi-column layout for descriptions
-        num_cols = 2
-        rows = []
-        for i in range(0, len(descriptions), num_cols):
-            row = descriptions[i:i+num_cols]
-            # Pad with empty strings if needed
-            while len(row) < num_cols:
-                row.append("")
-            rows.append(row)
-        
-        # Create table for descriptions
-        desc_table = Table(rows, colWidths=[280, 280])
-        desc_table.setStyle(TableStyle([
-            ('FONTSIZE', (0, 0), (-1, -1), 7),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 0),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-        ]))
+        # Create table for descriptions (the rows are fixed, so only the table is built per report)
+        desc_table = Table([list(row) for row in STATS_TABLE_DESCRIPTION_ROWS], colWidths=[280, 280])
+        desc_table.setStyle(styles['description_table'])
         
         elements.append(desc_table)
         
@@ -1185,7 +1186,11 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
         
         # Create race metrics plots (for all races)
         race_metrics_buf = create_race_metrics_plots(lap_stats)
-        race_metrics_img = Image(race_metrics_buf, width=500, height=250)
+        if race_metrics_buf is not None:
+            race_metrics_img = Image(race_metrics_buf, width=500, height=250)
+        else:
+            # Nothing to plot - draw the message directly rather than rendering an empty figure
+            race_metrics_img = _message_drawing('No metrics data available', width=500, height=250)
         
         # Add title for the race metrics plots
         elements.append(Paragraph("Race Performance Metrics", title_style))
@@ -1193,12 +1198,18 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
         elements.append(race_metrics_img)
         
         # For races up to 200 yards, add stroke-by-stroke analysis
-        debug_print(f"DEBUG in generate_pdf_report: data: {data is not None}")
-        debug_print(f"DEBUG in generate_pdf_report: 'events' in data: {data and 'events' in data}")
-        debug_print(f"DEBUG in generate_pdf_report: distance <= 200: {int(race_details['distance'].value) <= 200}")
-        debug_print(f"DEBUG in generate_pdf_report: Condition check: {data and 'events' in data and int(race_details['distance'].value) <= 200}")
-        
-        if data and 'events' in data and int(race_details['distance'].value) <= 200:
+        # The checks are only evaluated for the log when debugging
+        if DEBUG_MODE:
+            debug_print(f"DEBUG in generate_pdf_report: data: {data is not None}")
+            debug_print(f"DEBUG in generate_pdf_report: events in data: {bool(data) and len(_event_arrays(data)[0]) > 0}")
+            debug_print(f"DEBUG in generate_pdf_report: distance <= 200: {race_distance(race_details) <= 200}")
+        
+        # Skip the analysis pages entirely when no strokes were recorded
+        has_strokes = bool(data) and _sorted_times_by_type(data)[EventType.STROKE].size > 0
+        if not has_strokes:
+            debug_print("DEBUG: No strokes recorded, skipping stroke-by-stroke analysis")
+        
+        if has_strokes and race_distance(race_details) <= 200:
             debug_print("DEBUG: Adding stroke-by-stroke analysis")
             elements.append(PageBreak())
             elements.append(Paragraph("Stroke-by-Stroke Analysis", title_style))
@@ -1207,7 +1218,8 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
             try:
                 # Add stroke-by-stroke analysis
                 debug_print("DEBUG: About to call create_stroke_by_stroke_analysis_elements")
-                stroke_analysis_elements = create_stroke_by_stroke_analysis_elements(data, race_details)
+                plot_dir = tempfile.mkdtemp(prefix='stroke_plots_')
+                stroke_analysis_elements = create_stroke_by_stroke_analysis_elements(data, race_details, plot_dir)
                 debug_print(f"DEBUG: Got {len(stroke_analysis_elements)} elements back")
                 elements.extend(stroke_analysis_elements)
                 
@@ -1222,145 +1234,181 @@ def generate_pdf_report(lap_stats, overall_stats, filepath, race_details, data=N
                 import traceback
                 traceback.print_exc()
     
-    doc.build(elements)
+    # Write the PDF streams as binary rather than ASCII85 text - without reportlab's C accelerator
+    # the ASCII85 encoding of the plot images is done in pure Python and is most of the build time.
+    # reportlab reads the setting while building, so it is only changed for this document
+    use_a85 = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        doc.build(elements)
+    finally:
+        rl_config.useA85 = use_a85
+        # The lap plot PNGs are only needed until the PDF has been written
+        if plot_dir:
+            shutil.rmtree(plot_dir, ignore_errors=True)
+
+# Race metrics plot panels, as (title, y label, series), where each series is
+# (column, marker, color, legend label, y offset of the value labels in points)
+_SPEED_PANEL = ('Swimming Speed by Lap', 'Speed (yards/second)', (
+    ('UW Speed', 'o', 'red', 'Underwater', 5),
+    ('OW Speed', 's', 'blue', 'Overwater', -15),
+))
+_STROKE_RATE_PANEL = ('Stroke Rate by Lap', 'Stroke Rate (strokes/second)', (
+    ('Strokes per Second', 'o', 'green', None, 5),
+))
+_STROKE_RATE_ONLY_PANEL = ('Stroke Rate by Lap', 'Stroke Rate (strokes/second)', (
+    ('Strokes per Second', 'o', 'blue', None, 5),
+))
+_UW_SPEED_ONLY_PANEL = ('Underwater Speed by Lap', 'Underwater Speed (yards/second)', (
+    ('UW Speed', 'o', 'red', None, 5),
+))
+
+def _column_values(lap_stats, column):
+    """
+    Return a lap stats column as a NumPy array, or an empty array if the column is missing.
+    """
+    return lap_stats[column].to_numpy() if column in lap_stats.columns else np.empty(0)
+
+def _plot_metric_panel(ax, laps, metrics, panel):
+    """
+    Draw one race metrics panel: a line for each of its metrics that has data, with every point
+    labelled with its value. metrics maps column names to arrays of per-lap values (NaN where missing).
+    """
+    title, ylabel, series = panel
+    has_legend = False
+    
+    for column, marker, color, label, label_offset in series:
+        # Skip laps (or whole metrics) with missing data
+        values = metrics[column]
+        valid = ~np.isnan(values)
+        if not valid.any():
+            continue
+        
+        valid_laps = laps[valid].tolist()
+        valid_values = values[valid].tolist()
+        
+        ax.plot(valid_laps, valid_values, 
+                marker=marker, linestyle='-', color=color, linewidth=2, markersize=8,
+                label=label)
+        has_legend = has_legend or label is not None
+        
+        # Add data labels
+        _label_points(ax, valid_laps, valid_values, [f"{value}" for value in valid_values],
+                      offset=label_offset)
+    
+    if has_legend:
+        ax.legend()
+    
+    # Set titles and labels
+    ax.set_title(title)
+    ax.set_xlabel('Lap')
+    ax.set_ylabel(ylabel)
+    ax.grid(True, alpha=0.3)
+    ax.set_xticks(laps)
+
+def _message_drawing(message, width, height):
+    """
+    Create a reportlab drawing of the given size (points) with a message in the middle,
+    used in place of a plot when there is nothing to plot.
+    """
+    from reportlab.graphics.shapes import Drawing, String
+    drawing = Drawing(width, height)
+    drawing.add(String(width / 2, height / 2, message, textAnchor='middle', fontName='Helvetica', fontSize=14))
+    return drawing
 
 def create_race_metrics_plots(lap_stats):
     """
     Create plots showing underwater speed, overwater speed, and stroke rate across the race.
     Handles cases where underwater speed data might be missing.
+    Returns a bytes buffer containing the image, or None if there are no metrics to plot.
     """
+    # Get the lap numbers and metrics as arrays once (empty if a column is missing)
+    laps = _column_values(lap_stats, 'Lap')
+    metrics = {column: _column_values(lap_stats, column)
+               for column in ('UW Speed', 'OW Speed', 'Strokes per Second')}
+    
     # Check if we have underwater and overwater speed data
-    has_uw_data = 'UW Speed' in lap_stats.columns and not lap_stats['UW Speed'].isna().all()
-    has_ow_data = 'OW Speed' in lap_stats.columns and not lap_stats['OW Speed'].isna().all()
-    has_stroke_data = 'Strokes per Second' in lap_stats.columns and not lap_stats['Strokes per Second'].isna().all()
+    has_uw_data = not np.isnan(metrics['UW Speed']).all()
+    has_ow_data = not np.isnan(metrics['OW Speed']).all()
+    has_stroke_data = not np.isnan(metrics['Strokes per Second']).all()
     
+    # Pick the panels to draw
     if (has_uw_data or has_ow_data) and has_stroke_data:
-        # Create side-by-side plots if we have both types of data
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 5))
-        
-        # Filter out rows with missing data
-        valid_uw_data = lap_stats.dropna(subset=['UW Speed']) if has_uw_data else pd.DataFrame()
-        valid_ow_data = lap_stats.dropna(subset=['OW Speed']) if has_ow_data else pd.DataFrame()
-        valid_strk_data = lap_stats.dropna(subset=['Strokes per Second'])
-        
-        # Plot underwater and overwater speed on the same axis
-        if has_uw_data or has_ow_data:
-            if has_uw_data:
-                ax1.plot(valid_uw_data['Lap'], valid_uw_data['UW Speed'], 
-                        marker='o', linestyle='-', color='red', linewidth=2, markersize=8,
-                        label='Underwater')
-                
-                # Add data labels for underwater speed
-                for i, row in valid_uw_data.iterrows():
-                    ax1.annotate(f"{row['UW Speed']}", 
-                                (row['Lap'], row['UW Speed']),
-                                xytext=(0, 5), textcoords='offset points',
-                                ha='center')
-            
-            if has_ow_data:
-                ax1.plot(valid_ow_data['Lap'], valid_ow_data['OW Speed'], 
-                        marker='s', linestyle='-', color='blue', linewidth=2, markersize=8,
-                        label='Overwater')
-                
-                # Add data labels for overwater speed
-                for i, row in valid_ow_data.iterrows():
-                    ax1.annotate(f"{row['OW Speed']}", 
-                                (row['Lap'], row['OW Speed']),
-                                xytext=(0, -15), textcoords='offset points',
-                                ha='center')
-            
-            ax1.legend()
-        
-        # Plot stroke rate
-        ax2.plot(valid_strk_data['Lap'], valid_strk_data['Strokes per Second'], 
-                marker='o', linestyle='-', color='green', linewidth=2, markersize=8)
-        
-        # Add data labels for stroke rate
-        for i, row in valid_strk_data.iterrows():
-            ax2.annotate(f"{row['Strokes per Second']}", 
-                        (row['Lap'], row['Strokes per Second']),
-                        xytext=(0, 5), textcoords='offset points',
-                        ha='center')
-        
-        # Set titles and labels
-        ax1.set_title('Swimming Speed by Lap')
-        ax1.set_xlabel('Lap')
-        ax1.set_ylabel('Speed (yards/second)')
-        ax1.grid(True, alpha=0.3)
-        ax1.set_xticks(lap_stats['Lap'])
-        
-        ax2.set_title('Stroke Rate by Lap')
-        ax2.set_xlabel('Lap')
-        ax2.set_ylabel('Stroke Rate (strokes/second)')
-        ax2.grid(True, alpha=0.3)
-        ax2.set_xticks(lap_stats['Lap'])
-    
+        # Side-by-side plots if we have both types of data
+        panels = (_SPEED_PANEL, _STROKE_RATE_PANEL)
+        fig, axes = _reuse_figure(10, 5, ncols=2)
     elif has_stroke_data:
-        # Create only stroke rate plot if that's all we have
-        fig, ax = plt.subplots(figsize=(8, 5))
-        
-        # Filter out rows with missing data
-        valid_strk_data = lap_stats.dropna(subset=['Strokes per Second'])
-        
-        # Plot stroke rate
-        ax.plot(valid_strk_data['Lap'], valid_strk_data['Strokes per Second'], 
-               marker='o', linestyle='-', color='blue', linewidth=2, markersize=8)
-        
-        # Add data labels for stroke rate
-        for i, row in valid_strk_data.iterrows():
-            ax.annotate(f"{row['Strokes per Second']}", 
-                      (row['Lap'], row['Strokes per Second']),
-                      xytext=(0, 5), textcoords='offset points',
-                      ha='center')
-        
-        # Set titles and labels
-        ax.set_title('Stroke Rate by Lap')
-        ax.set_xlabel('Lap')
-        ax.set_ylabel('Stroke Rate (strokes/second)')
-        ax.grid(True, alpha=0.3)
-        ax.set_xticks(lap_stats['Lap'])
-    
+        # Only stroke rate plot if that's all we have
+        panels = (_STROKE_RATE_ONLY_PANEL,)
+        fig, ax = _reuse_figure(8, 5)
+        axes = (ax,)
     elif has_uw_data:
-        # Create only underwater speed plot if that's all we have
-        fig, ax = plt.subplots(figsize=(8, 5))
-        
-        # Filter out rows with missing data
-        valid_uw_data = lap_stats.dropna(subset=['UW Speed'])
-        
-        # Plot underwater speed
-        ax.plot(valid_uw_data['Lap'], valid_uw_data['UW Speed'], 
-               marker='o', linestyle='-', color='red', linewidth=2, markersize=8)
-        
-        # Add data labels for underwater speed
-        for i, row in valid_uw_data.iterrows():
-            ax.annotate(f"{row['UW Speed']}", 
-                      (row['Lap'], row['UW Speed']),
-                      xytext=(0, 5), textcoords='offset points',
-                      ha='center')
-        
-        # Set titles and labels
-        ax.set_title('Underwater Speed by Lap')
-        ax.set_xlabel('Lap')
-        ax.set_ylabel('Underwater Speed (yards/second)')
-        ax.grid(True, alpha=0.3)
-        ax.set_xticks(lap_stats['Lap'])
-    
+        # Only underwater speed plot if that's all we have
+        panels = (_UW_SPEED_ONLY_PANEL,)
+        fig, ax = _reuse_figure(8, 5)
+        axes = (ax,)
     else:
-        # Create an empty plot with a message if we have neither
-        fig, ax = plt.subplots(figsize=(8, 5))
-        ax.text(0.5, 0.5, 'No metrics data available', 
-               ha='center', va='center', transform=ax.transAxes, fontsize=14)
-        ax.axis('off')
+        # Nothing to plot if we have neither - the caller shows a message instead
+        return None
     
-    plt.tight_layout()
+    for ax, panel in zip(axes, panels):
+        _plot_metric_panel(ax, laps, metrics, panel)
     
     # Save to bytes buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
+    return _render_figure(fig)
+
+class MockEnum:
+    """
+    A simple class that mimics the behavior of the Enum classes in race details.
+    Its only attribute is a slot, so instances carry no per-object __dict__.
+    """
+    __slots__ = ('value',)
     
-    return buf
+    def __init__(self, value):
+        self.value = value
+
+def _run_batch_report(task):
+    """
+    Generate one report of a batch from a (csv_file, race_details, base_directory) task.
+    Returns True if the report was generated, False if it failed.
+    """
+    csv_file, race_details, base_directory = task
+    try:
+        run(race_details, base_directory)
+        return True
+    except Exception as e:
+        debug_print(f"Error processing {csv_file}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def _iter_session_csvs(stroke_turn_dir, sessions=None):
+    """
+    Yield (session_name, csv_path) for every race CSV under the stroke_and_turn directory,
+    in one scandir pass over the given sessions (or every session directory when sessions is None).
+    Hidden files are skipped, as a *.csv glob would. Raises FileNotFoundError if
+    stroke_turn_dir does not exist; a missing session directory is reported and skipped.
+    """
+    if sessions is None:
+        # scandir entries know whether they are directories without a stat call for each one
+        with os.scandir(stroke_turn_dir) as entries:
+            sessions = [entry.name for entry in entries if entry.is_dir()]
+        debug_print(f"Processing sessions: {sessions}")
+    
+    for session_name in sessions:
+        stroke_turn_path = os.path.join(stroke_turn_dir, session_name)
+        if DEBUG_MODE:
+            debug_print(f"DEBUG: Looking for stroke and turn data at: {stroke_turn_path}")
+        try:
+            with os.scandir(stroke_turn_path) as entries:
+                csv_files = [entry.path for entry in entries
+                             if entry.name.endswith('.csv') and not entry.name.startswith('.')
+                             and entry.is_file()]
+        except (FileNotFoundError, NotADirectoryError):
+            debug_print(f"Warning: No stroke and turn data found for session {session_name}")
+            continue
+        for csv_file in csv_files:
+            yield session_name, csv_file
 
 def generate_batch_reports(base_directory, session=None):
     """
@@ -1376,103 +1424,76 @@ def generate_batch_reports(base_directory, session=None):
     # Define the data directories to search
     data_dir = os.path.join("data", base_directory)
     
-    # Get all sessions if not specified
+    # Look for the CSV files of all sessions (or just the given one) in the stroke_and_turn directory
+    stroke_turn_dir = os.path.join(data_dir, "stroke_and_turn")
+    debug_print(f"DEBUG: Looking for stroke_and_turn directory at: {stroke_turn_dir}")
     if session:
-        sessions = [session]
-    else:
-        # Look for all session directories
-        stroke_turn_dir = os.path.join(data_dir, "stroke_and_turn")
-        debug_print(f"DEBUG: Looking for stroke_and_turn directory at: {stroke_turn_dir}")
-        if os.path.exists(stroke_turn_dir):
-            sessions = [d for d in os.listdir(stroke_turn_dir) 
-                      if os.path.isdir(os.path.join(stroke_turn_dir, d))]
-        else:
-            debug_print(f"Error: Directory {stroke_turn_dir} not found")
-            return 0, 0, 0
-    
-    debug_print(f"Processing sessions: {sessions}")
-    
-    # Process each session
-    for session_name in sessions:
-        # Look for CSV files in the stroke_and_turn directory
-        stroke_turn_path = os.path.join(data_dir, "stroke_and_turn", session_name)
-        debug_print(f"DEBUG: Looking for stroke and turn data at: {stroke_turn_path}")
-        if not os.path.exists(stroke_turn_path):
-            debug_print(f"Warning: No stroke and turn data found for session {session_name}")
-            continue
+        debug_print(f"Processing sessions: {[session]}")
+    
+    # Reports to generate, as (csv_file, race_details, base_directory) tasks
+    tasks = []
+    
+    # Phase 1: find the race CSVs of all sessions (or just the given one)
+    try:
+        race_files = list(_iter_session_csvs(stroke_turn_dir, [session] if session else None))
+    except (FileNotFoundError, NotADirectoryError):
+        debug_print(f"Error: Directory {stroke_turn_dir} not found")
+        return 0, 0, 0
+    
+    # Phase 2: parse the race details of each CSV file from its filename
+    for session_name, csv_file in race_files:
+        try:
+            # Extract race details from filename (<swimmer>_<gender>[_relay]_<distance>_<stroke>.csv)
+            filename = os.path.basename(csv_file)
+            stem = filename[:-4] if filename.endswith('.csv') else filename
+            # Split off only the last three parts; the swimmer name keeps its underscores
+            name_parts = stem.rsplit('_', 3)
             
-        csv_files = glob.glob(os.path.join(stroke_turn_path, "*.csv"))
-        
-        # Process each CSV file
-        for csv_file in csv_files:
-            try:
-                # Extract race details from filename
-                filename = os.path.basename(csv_file)
-                name_parts = filename.replace('.csv', '').split('_')
-                
-                if len(name_parts) < 4:
-                    debug_print(f"Warning: Invalid filename format: {filename}")
-                    skipped_count += 1
-                    continue
-                
-                # Parse the filename parts
-                # The last part is always the stroke
-                stroke = name_parts[-1]
-                
-                # The second-to-last part is always the distance
-                distance = name_parts[-2]
-                
-                # Check if "relay" is in the parts
-                is_relay = "relay" in name_parts
-                
-                # If relay is present, it affects the position of gender
-                if is_relay:
-                    # Find the index of "relay"
-                    relay_index = name_parts.index("relay")
-                    # Gender is before relay
-                    gender = name_parts[relay_index-1]
-                    # Swimmer name is everything before gender
-                    swimmer_name = ' '.join(name_parts[:relay_index-1])
-                else:
-                    # No relay - gender is the third-to-last part
-                    gender = name_parts[-3]
-                    # Swimmer name is everything before gender
-                    swimmer_name = ' '.join(name_parts[:-3])
-                
-                # Create a simple class that mimics the behavior of the Enum classes
-                class MockEnum:
-                    def __init__(self, value):
-                        self.value = value
-                
-                # Create the race details dictionary with mock enum objects
-                race_details = {
-                    'swimmer_name': swimmer_name,
-                    'gender': MockEnum(gender),
-                    'distance': MockEnum(int(distance)),
-                    'stroke': MockEnum(stroke),
-                    'session': MockEnum(session_name),
-                    'relay': is_relay
-                }
-                
-                # Generate the report
+            if len(name_parts) < 4:
+                debug_print(f"Warning: Invalid filename format: {filename}")
+                skipped_count += 1
+                continue
+            
+            # The last part is always the stroke, the second-to-last the distance
+            # and (with no relay) the third-to-last the gender
+            swimmer_name, gender, distance, stroke = name_parts
+            
+            # If relay is present, gender is the part before it
+            is_relay = '_relay_' in stem
+            if is_relay:
+                swimmer_name, _, gender = stem.partition('_relay_')[0].rpartition('_')
+            
+            # Swimmer name is everything before gender
+            swimmer_name = swimmer_name.replace('_', ' ')
+            
+            # Create the race details dictionary with mock enum objects
+            race_details = {
+                'swimmer_name': swimmer_name,
+                'gender': MockEnum(gender),
+                'distance': MockEnum(int(distance)),
+                'stroke': MockEnum(stroke),
+                'session': MockEnum(session_name),
+                'relay': is_relay
+            }
+            
+            # Generate the report
+            if DEBUG_MODE:
                 relay_text = "Relay " if is_relay else ""
                 debug_print(f"Generating report for: {swimmer_name} - {gender} {relay_text}{distance}yd {stroke} ({session_name})")
-                
-                # Preserve the full directory structure
-                data_dir = os.path.join("data", base_directory)
-                # Get the relative path from the data directory to the csv_file directory
-                relative_path = os.path.dirname(csv_file).replace(data_dir, "").lstrip(os.path.sep)
-                debug_print(f"Debug - Base Directory: {base_directory}, Relative Path: {relative_path}")
-                # Pass the base directory plus the relative path to maintain structure
-                run(race_details, base_directory) #correct directory passed in
-                
-                success_count += 1
-                
-            except Exception as e:
-                debug_print(f"Error processing {csv_file}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                failure_count += 1
+            
+            # run() rebuilds the session directory structure from the base directory and race details
+            tasks.append((csv_file, race_details, base_directory))
+        
+        except Exception as e:
+            debug_print(f"Error processing {csv_file}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            failure_count += 1
+    
+    # Phase 3: generate the reports one after the other, in this process
+    results = [_run_batch_report(task) for task in tasks]
+    success_count += sum(results)
+    failure_count += len(results) - sum(results)
     
     # Print summary
     debug_print(f"\nBatch report generation complete:")